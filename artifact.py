@@ -0,0 +1,168 @@
+import os
+import sqlite3
+import time
+
+ARTIFACT_FILE = 'analysis.sqlite'
+SCHEMA_VERSION = 3
+# The first version whose files and folders can be listed one directory at a time
+TREE_INDEX_VERSION = 3
+# Children returned per call of list_children()
+TREE_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE files (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    lines INTEGER NOT NULL,
+    commit_count INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    skipped TEXT
+);
+CREATE TABLE folders (path TEXT PRIMARY KEY, parent TEXT NOT NULL, lines INTEGER NOT NULL, commit_count INTEGER NOT NULL);
+CREATE INDEX files_by_parent ON files (parent, path);
+CREATE INDEX folders_by_parent ON folders (parent, path);
+CREATE TABLE languages (name TEXT PRIMARY KEY, lines INTEGER NOT NULL);
+CREATE TABLE frameworks (name TEXT PRIMARY KEY, indicator TEXT NOT NULL);
+CREATE TABLE commits (
+    seq INTEGER PRIMARY KEY,
+    sha TEXT NOT NULL UNIQUE,
+    date TEXT NOT NULL,
+    author TEXT NOT NULL,
+    message TEXT NOT NULL,
+    insertions INTEGER NOT NULL,
+    deletions INTEGER NOT NULL
+);
+CREATE INDEX commits_by_author ON commits (author, date, seq);
+CREATE TABLE authors (
+    name TEXT PRIMARY KEY,
+    commit_count INTEGER NOT NULL,
+    lines_added INTEGER NOT NULL,
+    lines_removed INTEGER NOT NULL
+);
+CREATE TABLE blame (path TEXT NOT NULL, sha TEXT NOT NULL, lines INTEGER NOT NULL, PRIMARY KEY (path, sha));
+"""
+
+
+class AnalysisArtifact:
+    """The SQLite file holding everything an analysis computed, next to its reports.
+
+    It is built in a temporary file and only replaces the previous artifact
+    in finish(), so a failed analysis leaves the last good one in place.
+    Commits are stored in timeline order (seq), oldest first.
+    """
+
+    def __init__(self, report_dir):
+        self.path = report_dir / ARTIFACT_FILE
+        self.temp_path = report_dir / (ARTIFACT_FILE + '.tmp')
+        if self.temp_path.exists():
+            self.temp_path.unlink()
+        self.conn = sqlite3.connect(str(self.temp_path))
+        # A crash only loses the temporary file, so there is nothing for a journal to protect.
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.executescript(SCHEMA)
+        self.set_meta(schema_version=SCHEMA_VERSION)
+
+    def set_meta(self, **values):
+        self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                              [(key, None if value is None else str(value)) for key, value in values.items()])
+
+    def copy_commits(self, count):
+        """Copies the first `count` commits of the previous artifact's timeline."""
+        if not count:
+            return
+        self.conn.commit()
+        self.conn.execute("ATTACH DATABASE ? AS saved", (str(self.path),))
+        try:
+            self.conn.execute("INSERT INTO commits SELECT * FROM saved.commits WHERE seq < ? ORDER BY seq", (count,))
+            self.conn.commit()
+        finally:
+            self.conn.execute("DETACH DATABASE saved")
+
+    def add_commits(self, records):
+        """Appends (sha, record) pairs to the timeline as they stream in; returns how many were added."""
+        start = self.conn.execute("SELECT COUNT(*) FROM commits").fetchone()[0]
+        rows = ((seq, sha, stats['date'], stats['author'], stats['message'], stats['insertions'], stats['deletions'])
+                for seq, (sha, stats) in enumerate(records, start))
+        cursor = self.conn.executemany("INSERT INTO commits VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return cursor.rowcount
+
+    def add_files(self, rows):
+        """Stores (path, lines, commit_count, language, skip reason) rows."""
+        self.conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                              ((path, path.rpartition('/')[0], *rest) for path, *rest in rows))
+
+    def add_folders(self, rows):
+        """Stores (path, lines, commit_count) rows, one per directory."""
+        self.conn.executemany("INSERT INTO folders VALUES (?, ?, ?, ?)",
+                              ((path, path.rpartition('/')[0], *rest) for path, *rest in rows))
+
+    def add_blame(self, rows):
+        """Stores (path, commit sha, lines) rows: how many of a file's lines each commit last changed."""
+        self.conn.executemany("INSERT INTO blame VALUES (?, ?, ?)", rows)
+
+    def add_languages(self, languages):
+        self.conn.executemany("INSERT INTO languages VALUES (?, ?)", languages.items())
+
+    def add_frameworks(self, frameworks):
+        self.conn.executemany("INSERT INTO frameworks VALUES (?, ?)", frameworks.items())
+
+    def finish(self):
+        """Computes the per-author totals and moves the artifact into place."""
+        self.conn.execute("""
+            INSERT INTO authors
+            SELECT author, COUNT(*), SUM(insertions), SUM(deletions) FROM commits GROUP BY author
+        """)
+        self.set_meta(analyzed_at=time.strftime('%Y-%m-%d %H:%M:%S'))
+        self.conn.commit()
+        self.conn.close()
+        self.conn = None
+        os.replace(self.temp_path, self.path)
+
+    def close(self):
+        """Drops the artifact if it was not finished."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+            self.temp_path.unlink()
+
+
+def open_artifact(report_dir):
+    """Opens a finished artifact read-only."""
+    path = report_dir / ARTIFACT_FILE
+    if not path.exists():
+        raise FileNotFoundError(f"No analysis data found in {report_dir}; analyze the repository first.")
+    conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def read_meta(conn):
+    """Returns the artifact's metadata (repository, HEAD, analysis time, ...) as a dict."""
+    return {row['key']: row['value'] for row in conn.execute("SELECT key, value FROM meta")}
+
+
+def has_tree_index(meta):
+    """Tells whether an artifact, by its metadata, can list its tree one directory at a time."""
+    return int(meta.get('schema_version') or 0) >= TREE_INDEX_VERSION
+
+
+def list_children(conn, folder='', offset=0, limit=TREE_PAGE_SIZE):
+    """Returns one page of a directory's children, subdirectories first, and how many children it has.
+
+    Children are dicts with name, path, dir, lines and commit_count, sorted
+    by name like folder_structure.md. Only the index entries of `folder`
+    are read, so the cost does not grow with the size of the repository.
+    """
+    dir_count = conn.execute("SELECT COUNT(*) FROM folders WHERE parent = ?", (folder,)).fetchone()[0]
+    file_count = conn.execute("SELECT COUNT(*) FROM files WHERE parent = ?", (folder,)).fetchone()[0]
+    children = []
+    for table, skip, is_dir in (('folders', offset, True), ('files', max(0, offset - dir_count), False)):
+        if len(children) >= limit or (is_dir and offset >= dir_count):
+            continue
+        rows = conn.execute(f"SELECT path, lines, commit_count FROM {table} WHERE parent = ? ORDER BY path LIMIT ? OFFSET ?",
+                            (folder, limit - len(children), skip))
+        children.extend({'name': row['path'].rpartition('/')[2], 'path': row['path'], 'dir': is_dir,
+                         'lines': row['lines'], 'commit_count': row['commit_count']} for row in rows)
+    return children, dir_count + file_count
@@ -0,0 +1,142 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+MAIN_SCRIPT = Path(__file__).resolve().parent / 'main.py'
+# How long a timed-out analysis gets to clean up after SIGTERM before it is killed.
+TERMINATE_GRACE_SECONDS = 10
+POLL_INTERVAL = 0.2
+
+
+def read_repo_list(list_file):
+    """Reads repository URLs or paths from a file, one per line; blank lines and # comments are skipped."""
+    entries = []
+    with open(list_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                entries.append(line)
+    return entries
+
+
+def start_analysis(repo_url, log_path, lang, clone_mode, workers, window=None, approximate=None, ownership=False):
+    """Starts one analysis as a `main.py --repo` child process writing to its own log.
+
+    `window` holds the history window options (since, until, max_commits) passed on to it.
+    """
+    command = [sys.executable, str(MAIN_SCRIPT), '--repo', repo_url, '--lang', lang,
+               '--clone-mode', clone_mode, '--workers', str(workers)]
+    for name, value in (window or {}).items():
+        if value:
+            command += [f"--{name.replace('_', '-')}", str(value)]
+    if approximate:
+        command += ['--approximate', str(approximate)]
+    if ownership:
+        command.append('--ownership')
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log = open(log_path, 'w', encoding='utf-8')
+    options = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == 'nt' else {'start_new_session': True}
+    proc = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, **options)
+    return proc, log
+
+
+def stop_analysis(proc):
+    """Asks an analysis to clean up and exit, then kills it with its git children."""
+    proc.terminate()
+    try:
+        proc.wait(TERMINATE_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        if os.name == 'nt':
+            proc.kill()
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+
+
+def last_error(log_path):
+    """Returns the last error line an analysis logged."""
+    try:
+        lines = [line.strip() for line in log_path.read_text(encoding='utf-8', errors='ignore').splitlines() if line.strip()]
+    except OSError:
+        return ''
+    errors = [line for line in lines if line.startswith('❌') or 'Error' in line]
+    return (errors or lines or [''])[-1]
+
+
+def run_batch(entries, concurrency=4, timeout=None, lang="EN", clone_mode="checkout", workers=1, window=None, approximate=None,
+              ownership=False):
+    """Analyzes many repositories, at most `concurrency` at a time, each within `timeout` seconds.
+
+    Every repository gets the usual reports/<repo>/ output plus an
+    analysis.log; a summary of all runs is written to reports/batch_summary.md and .json.
+    Entries sharing a report directory (a/proj and b/proj, or a repository
+    listed twice) never run at the same time; the later one waits its turn.
+    """
+    from main import get_repo_name
+
+    reports_dir = Path('reports')
+    pending = deque(entries)
+    running = []
+    results = []
+    while pending or running:
+        busy = {job['log_path'].parent for job in running}
+        for repo_url in list(pending):
+            if len(running) >= concurrency:
+                break
+            log_path = reports_dir / get_repo_name(repo_url) / 'analysis.log'
+            if log_path.parent in busy:
+                continue
+            pending.remove(repo_url)
+            busy.add(log_path.parent)
+            proc, log = start_analysis(repo_url, log_path, lang, clone_mode, workers, window, approximate, ownership)
+            running.append({'repo': repo_url, 'proc': proc, 'log': log, 'log_path': log_path, 'start': time.time()})
+            print(f"🚀 Started {repo_url}")
+
+        for job in list(running):
+            duration = time.time() - job['start']
+            status = None
+            if job['proc'].poll() is not None:
+                status = 'success' if job['proc'].returncode == 0 else 'failed'
+            elif timeout and duration > timeout:
+                stop_analysis(job['proc'])
+                status = 'timeout'
+            if status is None:
+                continue
+            job['log'].close()
+            running.remove(job)
+            result = {
+                'repo': job['repo'],
+                'status': status,
+                'duration': round(duration, 2),
+                'report_dir': str(job['log_path'].parent),
+                'error': '' if status == 'success' else (f"Timed out after {timeout}s" if status == 'timeout' else last_error(job['log_path']))
+            }
+            results.append(result)
+            icon = '✅' if status == 'success' else '❌'
+            print(f"{icon} {job['repo']}: {status} ({result['duration']:.1f}s)")
+        time.sleep(POLL_INTERVAL)
+
+    write_summary(reports_dir, results)
+    return results
+
+
+def write_summary(reports_dir, results):
+    """Writes the batch summary index as Markdown and JSON."""
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    succeeded = sum(1 for result in results if result['status'] == 'success')
+    with open(reports_dir / 'batch_summary.json', 'w', encoding='utf-8') as f:
+        json.dump({'succeeded': succeeded, 'failed': len(results) - succeeded, 'results': results}, f, indent=2)
+    with open(reports_dir / 'batch_summary.md', 'w', encoding='utf-8') as f:
+        f.write("# Batch Analysis Summary\n\n")
+        f.write(f"- **Succeeded**: {succeeded}\n")
+        f.write(f"- **Failed**: {len(results) - succeeded}\n\n")
+        f.write("| Repository | Status | Duration (s) | Reports | Error |\n")
+        f.write("|------------|--------|--------------|---------|-------|\n")
+        for result in results:
+            f.write(f"| {result['repo']} | {result['status']} | {result['duration']:.1f} | {result['report_dir']} | {result['error']} |\n")
+        f.write(f"\n---\nGenerated with [Q-Git](https://github.com/QLineTech/Q-Git) on {time.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from blobs import CLONE_MODES
+from file_utils import safe_rmtree
+
+PRESETS = {
+    'small': {'files': 200, 'depth': 3, 'commits': 500, 'authors': 5, 'renames': 0.02, 'binaries': 0.02},
+    'medium': {'files': 2000, 'depth': 5, 'commits': 5000, 'authors': 25, 'renames': 0.02, 'binaries': 0.02},
+    'large': {'files': 10000, 'depth': 6, 'commits': 50000, 'authors': 100, 'renames': 0.01, 'binaries': 0.01},
+}
+TEXT_EXTENSIONS = ['.py', '.js', '.ts', '.go', '.rs', '.java', '.c', '.cpp', '.html', '.css', '.md', '.txt']
+BINARY_EXTENSIONS = ['.png', '.bin']
+# Subdirectories per directory level; keeps the folder count bounded as depth grows.
+DIR_FANOUT = 4
+START_TIME = 1577836800  # 2020-01-01 00:00:00 UTC
+
+
+def generate_repo(path, files=200, depth=3, commits=500, authors=5, renames=0.02, binaries=0.02, seed=0):
+    """Creates a git repository at `path` with synthetic history, through `git fast-import`.
+
+    Files are added over the whole history until `files` exist, up to
+    `depth` directories deep; `binaries` is the fraction of them holding
+    binary data. Every commit also edits a few text files, and with
+    probability `renames` renames one. The same arguments and seed always
+    give the same repository.
+    """
+    rng = random.Random(seed)
+    path = Path(path)
+    subprocess.run(['git', 'init', '-q', str(path)], check=True)
+    subprocess.run(['git', '-C', str(path), 'symbolic-ref', 'HEAD', 'refs/heads/main'], check=True)
+    proc = subprocess.Popen(['git', '-C', str(path), 'fast-import', '--quiet'], stdin=subprocess.PIPE)
+
+    contents = {}
+    timestamp = START_TIME
+
+    def new_path(number):
+        parts = [f"dir{rng.randrange(DIR_FANOUT)}" for _ in range(rng.randint(0, depth))]
+        binary = rng.random() < binaries
+        extension = rng.choice(BINARY_EXTENSIONS if binary else TEXT_EXTENSIONS)
+        return '/'.join(parts + [f"file{number}{extension}"]), binary
+
+    def text_lines(count):
+        return [f"line {rng.randrange(1 << 30):x} {' '.join('x' * rng.randint(1, 8) for _ in range(rng.randint(1, 6)))}\n"
+                for _ in range(count)]
+
+    def modify(file_path, data):
+        if isinstance(data, list):
+            data = ''.join(data).encode('utf-8')
+        return b'M 100644 inline ' + file_path.encode('utf-8') + b'\n' + b'data %d\n' % len(data) + data + b'\n'
+
+    try:
+        for number in range(commits):
+            timestamp += rng.randint(60, 7200)
+            author = rng.randrange(authors)
+            changes = []
+            text_files = [file_path for file_path, data in contents.items() if isinstance(data, list)]
+            # Spread the files over the history so that exactly `files` exist at the end.
+            remaining = files - len(contents)
+            adds = remaining // (commits - number) + (rng.random() < remaining % (commits - number) / (commits - number))
+            for _ in range(adds):
+                file_path, binary = new_path(len(contents))
+                contents[file_path] = rng.randbytes(rng.randint(256, 4096)) + b'\0' if binary else text_lines(rng.randint(5, 200))
+                changes.append(modify(file_path, contents[file_path]))
+            if text_files and rng.random() < renames:
+                source = rng.choice(text_files)
+                target, _ = new_path(len(contents))
+                target = os.path.splitext(target)[0] + os.path.splitext(source)[1]
+                if target not in contents:
+                    contents[target] = contents.pop(source)
+                    changes.append(f'R "{source}" "{target}"\n'.encode('utf-8'))
+                    text_files.remove(source)
+            for file_path in rng.sample(text_files, min(len(text_files), rng.randint(1, 3))):
+                lines = contents[file_path]
+                for _ in range(rng.randint(1, 5)):
+                    position = rng.randrange(len(lines) + 1)
+                    if lines and rng.random() < 0.3:
+                        del lines[min(position, len(lines) - 1)]
+                    else:
+                        lines[position:position] = text_lines(1)
+                changes.append(modify(file_path, lines))
+
+            message = f"Change {number}: {rng.choice(['fix', 'add', 'update', 'refactor'])} things".encode('utf-8')
+            identity = f"Author {author} <author{author}@example.com> {timestamp} +0000".encode('utf-8')
+            proc.stdin.write(b'commit refs/heads/main\n'
+                             + b'author ' + identity + b'\ncommitter ' + identity + b'\n'
+                             + b'data %d\n' % len(message) + message + b'\n'
+                             + b''.join(changes) + b'\n')
+    finally:
+        proc.stdin.close()
+        if proc.wait():
+            raise RuntimeError(f"git fast-import failed with exit code {proc.returncode}")
+    subprocess.run(['git', '-C', str(path), 'reset', '-q', '--hard'], check=True)
+    return path
+
+
+def run_benchmark(repo_url, runs=3, workers=1, clone_mode="checkout"):
+    """Analyzes repo_url `runs` times from scratch and returns the run summary of each run.
+
+    Every analysis writes its reports and blob cache to a temporary
+    directory of its own, so none of them reads ./reports or the blob cache
+    another one wrote. Local repositories
+    are cloned too (force_clone), so clone_mode is what is measured. Stages
+    are those of analyze_repo: clone, files (tree listing), analyze (line
+    counts and per-file history), tree, history (commit stats), languages
+    and reports (artifact and report writing).
+    """
+    from main import analyze_repo
+
+    results = []
+    work_dir = Path(tempfile.mkdtemp())
+    try:
+        for run in range(runs):
+            run_dir = work_dir / f"run{run + 1}"
+            summaries = []
+
+            def on_event(event):
+                if event.summary:
+                    summaries.append(event.summary)
+
+            analyze_repo(repo_url, clone_mode=clone_mode, incremental=False, workers=workers, force_clone=True,
+                         reports_dir=run_dir / 'reports', blob_cache=run_dir / 'blob_cache.sqlite', progress_callback=on_event)
+            summary = summaries[-1]
+            results.append({key: summary[key] for key in ('wall', 'cpu', 'git_processes', 'max_rss_kb', 'stages')})
+            print(f"⏱️  Run {run + 1}/{runs}: {summary['wall']:.2f}s")
+    finally:
+        safe_rmtree(work_dir)
+    return results
+
+
+def summarize(results):
+    """Returns the median wall time, CPU time and git processes of several runs, in total and per stage."""
+    stages = {}
+    for result in results:
+        for stage in result['stages']:
+            stages.setdefault(stage['stage'], []).append(stage)
+
+    def median(records, key):
+        return round(statistics.median(record[key] for record in records), 4)
+
+    return dict({key: median(results, key) for key in ('wall', 'cpu', 'git_processes')},
+                stages={stage: {key: median(records, key) for key in ('wall', 'cpu', 'git_processes')}
+                        for stage, records in stages.items()})
+
+
+def print_summary(summary, baseline=None):
+    """Prints the median stage times, with the change from a baseline result when given."""
+    rows = list(summary['stages'].items()) + [('total', summary)]
+    base = dict(baseline['median']['stages'], total=baseline['median']) if baseline else {}
+    for stage, times in rows:
+        line = f"  {stage:<10} {times['wall']:9.3f}s  cpu {times['cpu']:8.3f}s  git {times['git_processes']:6g}"
+        if stage in base:
+            was = base[stage]['wall']
+            change = (times['wall'] - was) / was * 100 if was else 0
+            line += f"   (was {was:.3f}s, {change:+.1f}%)"
+        print(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Q-Git benchmark: times analyze_repo on a synthetic or local repository")
+    parser.add_argument('--preset', choices=PRESETS, default='small', help="size of the generated repository")
+    for option, kind in [('files', int), ('depth', int), ('commits', int), ('authors', int), ('renames', float), ('binaries', float)]:
+        parser.add_argument(f'--{option}', type=kind, help=f"override the preset's {option}")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the generated repository")
+    parser.add_argument('--repo', help="benchmark this local path or file:// URL instead of generating a repository")
+    parser.add_argument('--keep', metavar='DIR', help="generate the repository into DIR and keep it")
+    parser.add_argument('--runs', type=int, default=3, help="analyses to time")
+    parser.add_argument('--workers', type=int, default=1, help="processes used for history analysis")
+    parser.add_argument('--clone-mode', choices=CLONE_MODES, default="checkout", help="how the repository is cloned")
+    parser.add_argument('--output', default='benchmark.json', help="JSON file the results are written to")
+    parser.add_argument('--compare', metavar='FILE', help="earlier results to compare with")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    params = dict(PRESETS[args.preset])
+    params.update({key: getattr(args, key) for key in params if getattr(args, key) is not None})
+    # Mirrors would turn the clone stage into a cache hit, and known blobs the line counting.
+    os.environ.pop('QGIT_CACHE_DIR', None)
+    os.environ.pop('QGIT_BLOB_CACHE', None)
+
+    temp_dir = None
+    try:
+        if args.repo:
+            repo_url, repo_info = args.repo, {'source': args.repo}
+        else:
+            if args.keep:
+                repo_path = Path(args.keep)
+            else:
+                temp_dir = tempfile.mkdtemp()
+                repo_path = Path(temp_dir) / f"bench-{args.preset}"
+            print(f"🛠️  Generating repository: {params}")
+            start = time.perf_counter()
+            generate_repo(repo_path, seed=args.seed, **params)
+            print(f"✅ Generated in {time.perf_counter() - start:.2f}s: {repo_path}")
+            repo_url = repo_path.resolve().as_uri()
+            repo_info = dict(params, preset=args.preset, seed=args.seed)
+
+        results = run_benchmark(repo_url, args.runs, args.workers, args.clone_mode)
+    finally:
+        if temp_dir:
+            safe_rmtree(temp_dir)
+
+    git_version = subprocess.run(['git', '--version'], capture_output=True, text=True).stdout.strip()
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'git': git_version,
+        'platform': platform.platform(),
+        'repo': repo_info,
+        'options': {'runs': args.runs, 'workers': args.workers, 'clone_mode': args.clone_mode},
+        'runs': results,
+        'median': summarize(results),
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print("📊 Median stage times:")
+    print_summary(report['median'], baseline)
+    print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
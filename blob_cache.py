@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+CACHE_FILE = 'blob_cache.sqlite'
+# Used when there is no mirror cache to keep the blob cache next to.
+DEFAULT_DIR = Path('~') / '.cache' / 'q-git'
+DEFAULT_MAX_SIZE_MB = 256
+# SQLite limits the variables of one statement.
+LOOKUP_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha TEXT PRIMARY KEY,
+    lines INTEGER NOT NULL,
+    binary INTEGER NOT NULL,
+    last_used INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS blobs_by_use ON blobs (last_used);
+"""
+
+
+def default_cache_path(cache_dir=None):
+    """Returns the blob cache file from QGIT_BLOB_CACHE, else blob_cache.sqlite in the mirror cache_dir or ~/.cache/q-git."""
+    path = os.environ.get('QGIT_BLOB_CACHE')
+    return Path(path).expanduser() if path else Path(cache_dir or DEFAULT_DIR).expanduser() / CACHE_FILE
+
+
+def default_max_bytes():
+    """Returns the blob cache size limit from QGIT_BLOB_CACHE_MB."""
+    return int(os.environ.get('QGIT_BLOB_CACHE_MB', DEFAULT_MAX_SIZE_MB)) * 1024 * 1024
+
+
+def open_blob_cache(path=None):
+    """Opens the blob cache shared by every analyzed repository, creating it if needed."""
+    path = Path(path or default_cache_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Batch analyses and web jobs use it from several processes and threads at once.
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def lookup_blobs(shas, path=None):
+    """Returns {blob sha: lines} for the blobs already counted by any analysis; binary blobs map to None."""
+    shas = list(shas)
+    known = {}
+    conn = open_blob_cache(path)
+    try:
+        for start in range(0, len(shas), LOOKUP_BATCH):
+            batch = shas[start:start + LOOKUP_BATCH]
+            rows = conn.execute(f"SELECT sha, lines, binary FROM blobs WHERE sha IN ({', '.join('?' * len(batch))})", batch)
+            known.update((sha, None if binary else lines) for sha, lines, binary in rows)
+    finally:
+        conn.close()
+    return known
+
+
+def store_blobs(known, path=None, max_bytes=None):
+    """Saves {blob sha: lines, None for binary} as used just now, then drops the least recently used blobs beyond the size limit."""
+    now = int(time.time())
+    conn = open_blob_cache(path)
+    try:
+        with conn:
+            conn.executemany("INSERT INTO blobs VALUES (?, ?, ?, ?) ON CONFLICT (sha) DO UPDATE SET last_used = excluded.last_used",
+                             ((sha, lines or 0, lines is None, now) for sha, lines in known.items()))
+            evict(conn, max_bytes if max_bytes is not None else default_max_bytes())
+    finally:
+        conn.close()
+
+
+def evict(conn, max_bytes):
+    """Deletes the least recently used blobs until the pages in use fit in max_bytes; returns how many were deleted."""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    used = (conn.execute("PRAGMA page_count").fetchone()[0] - conn.execute("PRAGMA freelist_count").fetchone()[0]) * page_size
+    if used <= max_bytes:
+        return 0
+    rows = conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+    # Rows are all about the same size; free a tenth more than needed so the next runs do not evict again at once.
+    drop = rows - int(rows * max_bytes * 0.9 / used)
+    conn.execute("DELETE FROM blobs WHERE sha IN (SELECT sha FROM blobs ORDER BY last_used LIMIT ?)", (drop,))
+    return drop
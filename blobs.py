@@ -0,0 +1,175 @@
+import codecs
+import itertools
+import subprocess
+import tempfile
+
+import git
+
+CHUNK_SIZE = 1 << 16
+CLONE_MODES = ["checkout", "bare", "blobless"]
+# Same fetch git itself runs to fill in missing objects of a partial clone.
+PREFETCH_ARGS = ['-c', 'fetch.negotiationAlgorithm=noop', 'fetch', 'origin', '--no-tags',
+                 '--no-write-fetch-head', '--recurse-submodules=no', '--filter=blob:none', '--stdin']
+
+
+def clone_options(clone_mode):
+    """Returns the `git.Repo.clone_from` keyword arguments for a clone mode."""
+    if clone_mode == "bare":
+        return {'bare': True}
+    if clone_mode == "blobless":
+        return {'bare': True, 'filter': 'blob:none'}
+    return {}
+
+
+def shallow_options(since=None, max_commits=None):
+    """Returns the `git.Repo.clone_from` keyword arguments that only fetch a window of history.
+
+    git cannot combine --shallow-since with --depth, so a since window, which
+    holds the max_commits one, wins. A depth window gets one extra generation
+    so its oldest commit still diffs against its parent; after a
+    --shallow-since clone, deepen_shallow_clone does the same.
+    """
+    if since:
+        return {'shallow_since': since}
+    if max_commits:
+        return {'depth': max_commits + 1}
+    return {}
+
+
+def deepen_shallow_clone(repo):
+    """Fetches one more generation behind a --shallow-since clone's oldest commits; returns False if git cannot.
+
+    Near a merge, --shallow-since can record a boundary commit it did not
+    fetch, and every later fetch of that clone (--deepen and --unshallow
+    alike) then fails with "error in object: unshallow".
+    """
+    try:
+        repo.git.fetch('--deepen=1', '--quiet', 'origin')
+    except git.GitCommandError:
+        return False
+    return True
+
+
+def list_tree(repo, rev='HEAD'):
+    """Lists (path, mode, object type, object SHA, size) for every entry of a commit's tree.
+
+    Size is None for entries that are not blobs (submodules).
+    """
+    entries = []
+    for record in repo.git.ls_tree('-r', '-l', '-z', '--full-tree', rev).split('\0'):
+        if not record:
+            continue
+        info, path = record.split('\t', 1)
+        mode, obj_type, sha, size = info.split()
+        entries.append((path, mode, obj_type, sha, int(size) if size != '-' else None))
+    return entries
+
+
+def prefetch_missing_blobs(repo, shas=None, rev='HEAD'):
+    """Downloads the blobs of a commit's tree that a partial clone is missing, in one fetch.
+
+    With `shas`, only those blobs are fetched.
+    """
+    listing = repo.git.rev_list('--objects', '--missing=print', f'{rev}^{{tree}}')
+    missing = [line[1:] for line in listing.split('\n') if line.startswith('?')]
+    if shas is not None:
+        wanted = set(shas)
+        missing = [sha for sha in missing if sha in wanted]
+    fetch_blobs(repo, missing)
+    return len(missing)
+
+
+def prefetch_history_blobs(repo, paths, rev='HEAD'):
+    """Downloads every version of `paths` in the history of `rev` that a partial clone is missing, in one fetch.
+
+    `git blame` reads them all; the older paths of renamed files are still
+    fetched on demand.
+    """
+    listing = subprocess.run(['git', '--literal-pathspecs', 'rev-list', '--objects', '--missing=print', '--stdin'],
+                             cwd=repo.git_dir, input=f"{rev}\n--\n" + ''.join(f"{path}\n" for path in paths),
+                             text=True, check=True, capture_output=True).stdout
+    missing = [line[1:] for line in listing.split('\n') if line.startswith('?')]
+    fetch_blobs(repo, missing)
+    return len(missing)
+
+
+def fetch_blobs(repo, shas):
+    """Downloads missing blobs of a partial clone from origin."""
+    if shas:
+        subprocess.run(['git', *PREFETCH_ARGS], cwd=repo.git_dir, input='\n'.join(shas) + '\n',
+                       text=True, check=True, capture_output=True)
+
+
+def read_blobs(repo, shas, max_bytes=None):
+    """Reads blobs through one streamed `git cat-file --batch`; returns {sha: contents}, leaving out missing ones.
+
+    With `max_bytes` only the start of every blob is kept and the rest is
+    skipped as it streams by, so memory does not grow with the blobs read.
+    """
+    if not shas:
+        return {}
+    blobs = {}
+    with tempfile.TemporaryFile() as requests:
+        requests.write(''.join(f"{sha}\n" for sha in shas).encode())
+        requests.seek(0)
+        proc = subprocess.Popen(['git', 'cat-file', '--batch'], cwd=repo.git_dir, stdin=requests, stdout=subprocess.PIPE)
+        try:
+            for header in iter(proc.stdout.readline, b''):
+                sha, obj_type, *size = header.decode('ascii').split()
+                if obj_type == 'missing':
+                    continue
+                size = int(size[0])
+                keep = size if max_bytes is None else min(size, max_bytes)
+                blobs[sha] = proc.stdout.read(keep)
+                # Every object is followed by a newline.
+                skip = size - keep + 1
+                while skip:
+                    chunk = proc.stdout.read(min(skip, CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    skip -= len(chunk)
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, 'git cat-file --batch')
+    return blobs
+
+
+def count_lines(chunks):
+    """Counts lines in raw bytes the way iterating a UTF-8 text-mode file with errors='ignore' does.
+
+    Lines are counted on the decoded text, so bytes dropped by the decoder
+    between a '\r' and a '\n' leave a single '\r\n' line break, as in text mode.
+    """
+    lines = 0
+    pending_cr = False
+    tail_has_text = False
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    for chunk in itertools.chain(chunks, [None]):
+        text = decoder.decode(chunk or b'', final=chunk is None)
+        if not text:
+            continue
+        lines += text.count('\n') + text.count('\r') - text.count('\r\n')
+        if pending_cr and text[0] == '\n':
+            lines -= 1
+        pending_cr = text[-1] == '\r'
+        last_break = max(text.rfind('\n'), text.rfind('\r'))
+        # A trailing line without a newline counts once some text follows the last break.
+        tail_has_text = last_break < len(text) - 1
+    return lines + (1 if tail_has_text else 0)
+
+
+def iter_blob_chunks(repo, sha):
+    """Streams a blob's contents through the repo's long-lived `git cat-file --batch` process."""
+    _, _, _, stream = repo.git.stream_object_data(sha)
+    try:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        # cat-file writes whole objects; the rest must be read before the next request.
+        while stream.read(CHUNK_SIZE):
+            pass
@@ -0,0 +1,133 @@
+import sqlite3
+import time
+
+from artifact import ARTIFACT_FILE, open_artifact, read_meta
+
+CATALOG_FILE = 'catalog.sqlite'
+PAGE_SIZE = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    repo_url TEXT,
+    head TEXT,
+    analyzed_at TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_by_time ON reports (analyzed_at);
+CREATE TABLE IF NOT EXISTS report_files (
+    report TEXT NOT NULL REFERENCES reports (name) ON DELETE CASCADE,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (report, filename)
+);
+"""
+
+
+def open_catalog(reports_dir):
+    """Opens the catalog of analyzed repositories and users in reports_dir, creating it if needed."""
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    # Batch analyses record their reports from several processes at once.
+    conn = sqlite3.connect(str(reports_dir / CATALOG_FILE), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def describe_report(report_dir):
+    """Returns the catalog entry and (filename, size) pairs for one report directory."""
+    files = sorted((path.name, path.stat().st_size) for path in report_dir.glob('*.md'))
+    entry = {
+        'name': report_dir.name,
+        'kind': 'user' if report_dir.name.startswith('user_') else 'repo',
+        'repo_url': None,
+        'head': None,
+        'analyzed_at': None,
+        'size': sum(size for _, size in files)
+    }
+    if (report_dir / ARTIFACT_FILE).exists():
+        conn = open_artifact(report_dir)
+        try:
+            meta = read_meta(conn)
+        finally:
+            conn.close()
+        entry.update(repo_url=meta.get('repo_url'), head=meta.get('head'), analyzed_at=meta.get('analyzed_at'))
+    if not entry['analyzed_at']:
+        latest = max((path.stat().st_mtime for path in report_dir.glob('*.md')), default=time.time())
+        entry['analyzed_at'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(latest))
+    return entry, files
+
+
+def record_report(report_dir):
+    """Adds or refreshes one report directory in the catalog next to it; called when an analysis finishes."""
+    entry, files = describe_report(report_dir)
+    conn = open_catalog(report_dir.parent)
+    try:
+        with conn:
+            _store(conn, entry, files)
+    finally:
+        conn.close()
+
+
+def _store(conn, entry, files):
+    conn.execute("DELETE FROM reports WHERE name = ?", (entry['name'],))
+    if not files:
+        return
+    conn.execute("INSERT INTO reports VALUES (:name, :kind, :repo_url, :head, :analyzed_at, :size)", entry)
+    conn.executemany("INSERT INTO report_files VALUES (?, ?, ?)", [(entry['name'], name, size) for name, size in files])
+
+
+def rebuild_catalog(reports_dir):
+    """Indexes every report directory again, e.g. for reports made before the catalog existed."""
+    conn = open_catalog(reports_dir)
+    try:
+        with conn:
+            conn.execute("DELETE FROM reports")
+            for report_dir in reports_dir.iterdir():
+                if report_dir.is_dir():
+                    _store(conn, *describe_report(report_dir))
+    finally:
+        conn.close()
+
+
+def ensure_catalog(reports_dir):
+    """Builds the catalog once if reports_dir does not have one yet."""
+    if not (reports_dir / CATALOG_FILE).exists():
+        rebuild_catalog(reports_dir)
+
+
+def list_reports(reports_dir, query='', kind=None, page=1, per_page=PAGE_SIZE, sort='recent'):
+    """Returns one page of catalog entries, each with its report files, and the number of matching entries.
+
+    `query` matches the report name or repository URL; `sort` is 'recent'
+    (newest analysis first) or 'name'.
+    """
+    conditions, params = [], []
+    if query:
+        conditions.append("(name LIKE ? ESCAPE '\\' OR repo_url LIKE ? ESCAPE '\\')")
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        params += [pattern, pattern]
+    if kind:
+        conditions.append("kind = ?")
+        params.append(kind)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order = "name" if sort == 'name' else "analyzed_at DESC, name"
+
+    conn = open_catalog(reports_dir)
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM reports {where}", params).fetchone()[0]
+        rows = conn.execute(f"SELECT * FROM reports {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                            params + [per_page, (max(page, 1) - 1) * per_page]).fetchall()
+        entries = [dict(row, files=[]) for row in rows]
+        by_name = {entry['name']: entry for entry in entries}
+        if by_name:
+            placeholders = ', '.join('?' * len(by_name))
+            for row in conn.execute(f"SELECT report, filename, size FROM report_files WHERE report IN ({placeholders}) "
+                                    "ORDER BY report, filename", list(by_name)):
+                by_name[row['report']]['files'].append({'name': row['filename'], 'size': row['size']})
+    finally:
+        conn.close()
+    return entries, total
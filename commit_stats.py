@@ -0,0 +1,80 @@
+from history import iter_log_records, log_commits, map_commit_shards
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Same diff as GitPython's `commit.stats`: no rename detection and merges compared to their first parent.
+STATS_ARGS = ['--format=%x01%H%x02%an%x02%cd%x02%B', f'--date=format:{DATE_FORMAT}',
+              '--numstat', '-z', '--no-renames', '--diff-merges=first-parent']
+
+
+def iter_stats(stream, on_progress=None):
+    """Parses a commit stats stream into (sha, record) pairs, in history order."""
+    sha = current = None
+    count = 0
+    for token in iter_log_records(stream):
+        token = token.lstrip('\n')
+        if not token:
+            continue
+        if token.startswith('\x01'):
+            if current:
+                yield sha, current
+            sha, author, date, message = token[1:].split('\x02', 3)
+            current = {
+                'author': author,
+                'date': date,
+                'message': message.strip().replace('\n', ' '),
+                'insertions': 0,
+                'deletions': 0
+            }
+            count += 1
+            if on_progress:
+                on_progress(count)
+        else:
+            added, deleted, _ = token.split('\t', 2)
+            current['insertions'] += int(added) if added != '-' else 0
+            current['deletions'] += int(deleted) if deleted != '-' else 0
+    if current:
+        yield sha, current
+
+
+def parse_stats(stream, on_progress=None):
+    """Parses a commit stats stream into {sha: record}, in history order."""
+    return dict(iter_stats(stream, on_progress))
+
+
+def read_stats_shard(git_dir, shas):
+    """Reads the stats of one shard of commits."""
+    proc = log_commits(git_dir, STATS_ARGS, shas)
+    stats = parse_stats(proc.stdout)
+    proc.wait()
+    return stats
+
+
+class CommitStats:
+    """Author, date, message, insertions and deletions per commit, read for a whole range in one git pass.
+
+    `limits` (see history.window_args) restrict the range to a window of history.
+    """
+
+    def __init__(self, repo, rev_range=None, workers=1, on_progress=None, limits=()):
+        self.repo = repo
+        self.rev_range = rev_range
+        self.limits = limits
+        self.workers = workers
+        self.on_progress = on_progress
+
+    def iter_records(self, reverse=False):
+        """Streams (sha, record) pairs for the range, newest first, or oldest first with `reverse`.
+
+        Nothing is kept, so memory stays flat however long the history is.
+        With several workers, shards of the range are read on a process pool
+        and yielded back in history order.
+        """
+        if self.workers > 1:
+            for shard_stats in map_commit_shards(read_stats_shard, self.repo, self.rev_range, self.workers,
+                                                 self.on_progress, reverse, self.limits):
+                yield from shard_stats.items()
+        else:
+            proc = self.repo.git.log(*STATS_ARGS, *(['--reverse'] if reverse else []), *self.limits,
+                                     *([self.rev_range] if self.rev_range else []), as_process=True)
+            yield from iter_stats(proc.stdout, self.on_progress)
+            proc.wait()
@@ -0,0 +1,20 @@
+import os
+import shutil
+import sys
+import time
+
+
+def safe_rmtree(path):
+    """Safely remove a directory tree, handling permission errors on Windows."""
+    def remove_readonly(func, path, _):
+        os.chmod(path, 0o777)
+        func(path)
+
+    for _ in range(5):
+        try:
+            shutil.rmtree(path, onerror=remove_readonly)
+            break
+        except PermissionError:
+            time.sleep(1)
+    else:
+        print(f"Warning: Could not fully remove temporary directory {path}", file=sys.stderr)
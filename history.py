@@ -0,0 +1,216 @@
+import itertools
+import tempfile
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import git
+
+from instrumentation import add_git_processes, run_counted
+
+# git log --follow runs rename detection with --find-copies-harder whenever the
+# followed path is created, so copies are followed as well as renames. Doing the
+# same once per commit gives the per-file results of --follow in a single pass.
+LOG_ARGS = ['--format=%x01%H %P', '--raw', '--numstat', '-z', '--find-copies-harder', '--diff-merges=first-parent']
+CHUNK_SIZE = 1 << 16
+MAX_SHARD_COMMITS = 5000
+
+
+def iter_log_records(stream):
+    """Yields NUL-separated tokens from a `git log -z` stream."""
+    pending = b''
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        tokens = (pending + chunk).split(b'\0')
+        pending = tokens.pop()
+        for token in tokens:
+            yield token.decode('utf-8', errors='surrogateescape')
+    if pending:
+        yield pending.decode('utf-8', errors='surrogateescape')
+
+
+def iter_commits_with_changes(stream):
+    """Parses the history stream into (sha, parents, changes, insertions, deletions) tuples.
+
+    `changes` holds (status, old_path, new_path) entries from the raw diff.
+    """
+    tokens = iter_log_records(stream)
+    commit = None
+    for token in tokens:
+        token = token.lstrip('\n')
+        if not token:
+            continue
+        if token.startswith('\x01'):
+            if commit:
+                yield commit
+            sha, _, parents = token[1:].partition(' ')
+            commit = (sha, parents.split(), [], [0], [0])
+        elif token.startswith(':'):
+            status = token.split()[-1][0]
+            if status in ('R', 'C'):
+                old_path, new_path = next(tokens), next(tokens)
+            else:
+                old_path = new_path = next(tokens)
+            commit[2].append((status, old_path, new_path))
+        else:
+            added, deleted, path = token.split('\t', 2)
+            if not path:
+                next(tokens), next(tokens)
+            commit[3][0] += int(added) if added != '-' else 0
+            commit[4][0] += int(deleted) if deleted != '-' else 0
+    if commit:
+        yield commit
+
+
+def window_args(since=None, until=None, max_commits=None):
+    """Returns the git options that limit history to a window: commits since and until a date, at most max_commits."""
+    args = []
+    if since:
+        args.append(f'--since={since}')
+    if until:
+        args.append(f'--until={until}')
+    if max_commits:
+        args.append(f'--max-count={max_commits}')
+    return args
+
+
+def pin_date(repo, date):
+    """Returns a date of a history window as the fixed timestamp '@<seconds>' it means now.
+
+    git completes dates such as '2024-01-01' or '3 months ago' with the
+    current time, so commands run minutes apart would see different windows.
+    """
+    if not date:
+        return date
+    return '@' + repo.git.rev_parse(f'--since={date}').split('=', 1)[1]
+
+
+def count_commits(repo, rev_range=None, limits=()):
+    """Counts the commits in a range without listing them."""
+    return int(repo.git.rev_list('--count', *limits, rev_range or 'HEAD'))
+
+
+def iter_rev_list(repo, rev_range=None, reverse=False, limits=()):
+    """Streams commit SHAs in the order `git log` shows them, or oldest first with `reverse`."""
+    proc = repo.git.rev_list(*(['--reverse'] if reverse else []), *limits, rev_range or 'HEAD', as_process=True)
+    for line in proc.stdout:
+        yield line.decode('ascii').strip()
+    proc.wait()
+
+
+def shard_size(total, workers):
+    """Commits per shard: a few shards per worker so uneven shards balance out, but never huge ones."""
+    return min(MAX_SHARD_COMMITS, max(1, -(-total // (workers * 4))))
+
+
+def iter_shards(shas, size):
+    """Splits a stream of commits into contiguous shards."""
+    shas = iter(shas)
+    while True:
+        shard = list(itertools.islice(shas, size))
+        if not shard:
+            return
+        yield shard
+
+
+def log_commits(git_dir, args, shas):
+    """Starts `git log` over exactly the given commits, in the given order."""
+    with tempfile.TemporaryFile() as revs:
+        revs.write(''.join(f'{sha}\n' for sha in shas).encode())
+        revs.seek(0)
+        return git.Repo(git_dir).git.log(*args, '--no-walk=unsorted', '--stdin', as_process=True, istream=revs)
+
+
+def map_commit_shards(reader, repo, rev_range, workers, on_progress=None, reverse=False, limits=()):
+    """Runs `reader(git_dir, shas)` over shards of a commit range on a process pool.
+
+    Results are yielded in history order (oldest first with `reverse`), so
+    merging them gives the same result as one serial pass. Only a couple
+    of shards per worker are in flight at a time, so memory does not grow
+    with the length of history. `on_progress(done, total)` is called with
+    the number of commits read as shards finish. `limits` (see window_args)
+    only apply to listing the commits; the readers get exact SHAs.
+    """
+    total = count_commits(repo, rev_range, limits)
+    shards = iter_shards(iter_rev_list(repo, rev_range, reverse, limits), shard_size(total, workers))
+    pending = deque()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            for shard in itertools.islice(shards, workers * 2):
+                pending.append((shard, executor.submit(run_counted, reader, repo.git_dir, shard)))
+            while pending:
+                shard, future = pending.popleft()
+                result, git_processes = future.result()
+                add_git_processes(git_processes)
+                for next_shard in itertools.islice(shards, 1):
+                    pending.append((next_shard, executor.submit(run_counted, reader, repo.git_dir, next_shard)))
+                done += len(shard)
+                if on_progress:
+                    on_progress(done, total)
+                yield result
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def read_history_shard(git_dir, shas):
+    """Parses the history stream of one shard of commits."""
+    proc = log_commits(git_dir, LOG_ARGS, shas)
+    records = list(iter_commits_with_changes(proc.stdout))
+    proc.wait()
+    return records
+
+
+def collect_history(repo, tracked_files, rev_range=None, workers=1, on_progress=None, limits=()):
+    """Builds per-file commit sets and rename chains from one `git log` stream.
+
+    The commit set of every tracked file matches `git log --follow`: merge
+    commits are left out and the file is followed through renames and copies.
+    With a rev_range such as 'old..new' only that part of history is read;
+    'followers' then maps each path at the range boundary to the tracked
+    files it became. With several workers the diffs are computed on a
+    process pool and only the rename resolution runs here.
+    `on_progress(done, total)` is called as commits are read; total is None
+    when the history is read in one pass. `limits` (see window_args) restrict
+    it to a window of history.
+    """
+    file_commits = {path: set() for path in tracked_files}
+    renames = {path: [] for path in tracked_files}
+    commit_count = 0
+    # Maps a path as it appears in older history to the tracked files that descend from it.
+    followers = {path: [path] for path in tracked_files}
+
+    if workers > 1:
+        proc = None
+        records = itertools.chain.from_iterable(map_commit_shards(read_history_shard, repo, rev_range, workers, on_progress,
+                                                                  limits=limits))
+    else:
+        proc = repo.git.log(*LOG_ARGS, *limits, *([rev_range] if rev_range else []), as_process=True)
+        records = iter_commits_with_changes(proc.stdout)
+    for sha, parents, entries, insertions, deletions in records:
+        commit_count += 1
+        if proc and on_progress:
+            on_progress(commit_count)
+        if len(parents) > 1:
+            continue
+        moved = defaultdict(list)
+        for status, old_path, new_path in entries:
+            targets = followers.get(new_path, ())
+            for target in targets:
+                file_commits[target].add(sha)
+            if status == 'R':
+                for target in followers.get(old_path, ()):
+                    file_commits[target].add(sha)
+            if status in ('R', 'C') and targets:
+                del followers[new_path]
+                for target in targets:
+                    renames[target].append(old_path)
+                moved[old_path].extend(targets)
+        for old_path, targets in moved.items():
+            followers.setdefault(old_path, []).extend(targets)
+    if proc:
+        proc.wait()
+
+    return {'files': file_commits, 'renames': renames, 'followers': followers}
@@ -0,0 +1,145 @@
+import gzip
+import json
+import os
+
+import git
+
+from blobs import prefetch_history_blobs
+from commit_stats import CommitStats
+from history import collect_history
+from ownership import blame_files
+
+STATE_FILE = 'analysis_state.json.gz'
+STATE_VERSION = 5
+
+
+def empty_state():
+    """Returns the state of a repository that has not been analyzed yet.
+
+    The timeline itself is kept in the analysis artifact; `commit_count`
+    says how many of its commits belong to this state. `window` is the
+    history window it covers, with its dates pinned to timestamps (None for
+    the whole history). `blame` maps
+    paths to their blob SHA and blame, [blob sha, {commit sha: lines}].
+    """
+    return {'version': STATE_VERSION, 'head': None, 'files': {}, 'skipped': {}, 'commit_count': 0, 'window': None,
+            'blame': {}}
+
+
+def load_state(report_dir):
+    """Loads the analysis state saved next to a repository's reports."""
+    path = report_dir / STATE_FILE
+    if not path.exists():
+        return empty_state()
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return empty_state()
+    if state.get('version') != STATE_VERSION:
+        return empty_state()
+    for data in state['files'].values():
+        data['commits'] = set(data['commits'])
+    return state
+
+
+def save_state(report_dir, state):
+    """Saves the analysis state next to the reports, replacing the previous one atomically.
+
+    Save it after the artifact is finished: the state only counts the
+    commits it knows about, so an artifact with more stays consistent with it.
+    """
+    files = {path: {'lines': data['lines'], 'commits': sorted(data['commits'])} for path, data in state['files'].items()}
+    path = report_dir / STATE_FILE
+    temp_path = path.with_name(path.name + '.tmp')
+    with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+        json.dump(dict(state, files=files), f)
+    os.replace(temp_path, path)
+
+
+def resume_point(repo, state, window=None, limits=()):
+    """Returns the previously analyzed HEAD when the current HEAD descends from it.
+
+    None means a full rebuild: nothing was analyzed yet, history was
+    rewritten (e.g. force-pushed) so the old HEAD is gone or no longer an
+    ancestor, or the history window changed. The window's dates are
+    compared pinned, so a relative or date-only one that moved since the
+    last run counts as changed. A max_commits window slides
+    with every new commit, so it is always rebuilt. So is a timeline that
+    appending the new commits would put out of order: a full build lists
+    commits by date (`git log --reverse`), and a merged branch can bring in
+    commits older than ones already saved.
+    """
+    old_head = state['head']
+    if not old_head or state.get('window') != window or (window and window['max_commits']):
+        return None
+    try:
+        repo.git.merge_base('--is-ancestor', old_head, 'HEAD')
+    except git.GitCommandError:
+        return None
+    # The new commits must be exactly the newest ones of the whole history, in the same order.
+    new_commits = repo.git.rev_list(*limits, f'{old_head}..HEAD').split()
+    if new_commits and repo.git.rev_list(*limits, f'--max-count={len(new_commits)}', 'HEAD').split() != new_commits:
+        return None
+    return old_head
+
+
+def update_files(repo, state, base, tracked_files, count_lines, workers=1, on_progress=None, limits=()):
+    """Brings per-file line counts and commit sets up to HEAD, reading only history after `base`.
+
+    `count_lines` takes a list of paths and returns ({path: lines}, {path: skip reason}).
+    `on_progress` receives the history progress and `limits` restrict it to a window (see collect_history).
+    """
+    old_files = state['files'] if base else {}
+    old_skipped = state['skipped'] if base else {}
+    history = collect_history(repo, tracked_files, f'{base}..HEAD' if base else None, workers, on_progress, limits)
+    changed = set(repo.git.diff('--name-only', '-z', '--no-renames', base, 'HEAD').split('\0')) if base else set()
+
+    counted, skipped = count_lines([path for path in tracked_files if path not in old_files or path in changed])
+    files = {}
+    for path in tracked_files:
+        if path in counted:
+            lines = counted[path]
+        else:
+            lines = old_files[path]['lines']
+            if path in old_skipped:
+                skipped[path] = old_skipped[path]
+        files[path] = {'lines': lines, 'commits': history['files'][path]}
+    # Older commits carry over along the rename chains that reach back to `base`.
+    for old_path, targets in history['followers'].items():
+        if old_path in old_files:
+            for target in targets:
+                files[target]['commits'] |= old_files[old_path]['commits']
+    state['files'] = files
+    state['skipped'] = skipped
+    return files
+
+
+def update_commits(repo, state, base, artifact, workers=1, on_progress=None, limits=()):
+    """Fills the artifact's timeline: the saved commits up to `base`, then the ones after it, streamed from git."""
+    if base:
+        artifact.copy_commits(state['commit_count'])
+    else:
+        state['commit_count'] = 0
+    commit_stats = CommitStats(repo, f'{base}..HEAD' if base else None, workers, on_progress, limits)
+    state['commit_count'] += artifact.add_commits(commit_stats.iter_records(reverse=True))
+    state['head'] = repo.head.commit.hexsha
+
+
+def update_ownership(repo, state, base, blobs, since=None, partial_clone=False, on_progress=None):
+    """Blames every file at HEAD and returns {path: {commit sha: lines}}.
+
+    `blobs` maps the paths to blame to their blob SHAs. Blame is kept with
+    the blob SHA it was computed for, so files whose contents did not change
+    since `base` are not blamed again. Copies share a blob but not their
+    history, so every path is blamed on its own. `since` stops blame at the
+    start of the history window. A `partial_clone` first downloads the
+    older versions of the files it blames.
+    """
+    cache = state['blame'] if base else {}
+    todo = [path for path, sha in blobs.items() if path not in cache or cache[path][0] != sha]
+    if partial_clone and todo:
+        prefetch_history_blobs(repo, todo)
+    blamed = blame_files(repo, todo, since, on_progress=on_progress)
+    state['blame'] = {path: [sha, blamed[path] if path in blamed else cache[path][1]] for path, sha in blobs.items()}
+    return {path: commits for path, (_, commits) in state['blame'].items()}
@@ -0,0 +1,169 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RUN_SUMMARY_FILE = 'run_summary.json'
+# Seconds between samples of the resident memory of a running stage
+RSS_SAMPLE_INTERVAL = 0.05
+
+# git processes started by this process from any thread, plus those pool workers reported back.
+_git_processes = 0
+_count_lock = threading.Lock()
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+
+def _audit_hook(event, args):
+    if event != 'subprocess.Popen':
+        return
+    executable, argv = args[0], args[1]
+    # Errors raised here would fail the Popen call itself.
+    try:
+        program = executable or (argv.split() if isinstance(argv, (str, bytes)) else list(argv))[0]
+        name = os.path.basename(os.fsdecode(program)).lower()
+    except (IndexError, TypeError):
+        return
+    if name in ('git', 'git.exe'):
+        add_git_processes(1)
+
+
+def add_git_processes(count):
+    """Adds git processes to this process's count, e.g. the ones a pool worker started for it."""
+    global _git_processes
+    with _count_lock:
+        _git_processes += count
+
+
+def git_process_count():
+    """Returns how many git processes this process (any thread) and its pool workers have started so far."""
+    global _hook_installed
+    if not _hook_installed:
+        with _hook_lock:
+            if not _hook_installed:
+                sys.addaudithook(_audit_hook)
+                _hook_installed = True
+    return _git_processes
+
+
+def run_counted(func, *args):
+    """Runs func(*args) in a pool worker and returns (result, git processes it started), to add in the parent."""
+    start = git_process_count()
+    result = func(*args)
+    return result, git_process_count() - start
+
+
+def cpu_time():
+    """Returns the CPU seconds used by this process and its finished children (git, pool workers)."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def max_rss_kb(who='self'):
+    """Returns the peak resident memory of this process ('self') or of its largest finished child ('children')."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # macOS reports bytes, Linux kilobytes.
+    return usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+
+
+def current_rss_kb():
+    """Returns the resident memory of this process right now, or None where /proc is missing (macOS, Windows)."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * (os.sysconf('SC_PAGE_SIZE') // 1024)
+
+
+class StageMeter:
+    """Measures each stage of an analysis: wall and CPU time, peak memory and git processes started.
+
+    CPU time and git processes are process-wide: git processes started on
+    thread pools count, and so do those started by process pool workers
+    once the parent adds them (see run_counted). A stage's peak_rss_kb is
+    the highest resident memory of this process sampled while it ran (every
+    RSS_SAMPLE_INTERVAL seconds, on systems with /proc; None elsewhere);
+    max_rss_kb and max_child_rss_kb of the summary are the high-water marks
+    of the whole run. The Python heap peak of each stage is added while
+    tracemalloc is tracing (python -X tracemalloc).
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages = []
+        self.current = None
+        self.peak_rss = None
+        self.sampler = None
+        self.sampler_lock = threading.Lock()
+        self.closed = False
+
+    def sample_rss(self):
+        rss = current_rss_kb()
+        with self.sampler_lock:
+            if rss is not None and self.current is not None and (self.peak_rss is None or rss > self.peak_rss):
+                self.peak_rss = rss
+
+    def _run_sampler(self):
+        while not self.closed:
+            self.sample_rss()
+            time.sleep(RSS_SAMPLE_INTERVAL)
+
+    def start(self, stage):
+        self.stop()
+        with self.sampler_lock:
+            self.current = (stage, time.perf_counter(), cpu_time(), git_process_count())
+            self.peak_rss = None
+        self.sample_rss()
+        if self.peak_rss is not None and self.sampler is None:
+            self.sampler = threading.Thread(target=self._run_sampler, name='qgit-rss-sampler', daemon=True)
+            self.sampler.start()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def stop(self):
+        if self.current is None:
+            return
+        self.sample_rss()
+        stage, wall, cpu, git_processes = self.current
+        record = {
+            'stage': stage,
+            'wall': round(time.perf_counter() - wall, 4),
+            'cpu': round(cpu_time() - cpu, 4),
+            'git_processes': git_process_count() - git_processes,
+            'peak_rss_kb': self.peak_rss
+        }
+        if tracemalloc.is_tracing():
+            record['python_peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+        self.stages.append(record)
+        with self.sampler_lock:
+            self.current = None
+
+    def summary(self):
+        """Returns the totals and per-stage records of the stages measured so far, and stops sampling."""
+        self.stop()
+        self.closed = True
+        return {
+            'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+            'wall': round(sum(stage['wall'] for stage in self.stages), 4),
+            'cpu': round(sum(stage['cpu'] for stage in self.stages), 4),
+            'git_processes': sum(stage['git_processes'] for stage in self.stages),
+            'max_rss_kb': max_rss_kb(),
+            'max_child_rss_kb': max_rss_kb('children'),
+            'stages': self.stages
+        }
+
+
+def save_run_summary(report_dir, summary):
+    """Writes an analysis's run summary next to its reports as run_summary.json."""
+    with open(report_dir / RUN_SUMMARY_FILE, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
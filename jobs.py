@@ -0,0 +1,293 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ACTIVE_STATUSES = ('Queued', 'Running')
+MAX_FINISHED_JOBS = 200
+# How long a stopped analysis gets to clean up before it is killed with its git children.
+TERMINATE_GRACE_SECONDS = 10
+POLL_INTERVAL = 0.2
+# Stages that always run to the end, so a stop request waits for them.
+FINAL_STAGES = ('cleanup', 'complete', 'error', 'finished')
+
+
+class JobCancelled(BaseException):
+    """Raised inside a job's process to stop its analysis; BaseException so analysis code does not swallow it."""
+
+
+class Job:
+    """One analysis request and its progress."""
+
+    def __init__(self, kind, target, lang, timeout=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.target = target
+        self.lang = lang
+        self.timeout = timeout
+        self.status = 'Queued'
+        self.message = 'Waiting for a free worker...'
+        self.percentage = 0
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_requested = False
+        self.future = None
+        self.event = None
+        # The run summary (time, memory and git processes per stage) sent when the analysis finishes.
+        self.summary = None
+        # Bumped and notified on every change, for clients waiting on updates.
+        self.version = 0
+        self.changed = threading.Condition()
+
+    @property
+    def key(self):
+        """Identifies the analysis: SSH and HTTPS URLs of a repository, with or without .git, are the same one."""
+        target = self.target.strip().rstrip('/').lower()
+        if target.startswith('git@github.com:'):
+            target = 'https://github.com/' + target[len('git@github.com:'):]
+        if target.endswith('.git'):
+            target = target[:-len('.git')]
+        return (self.kind, target, self.lang)
+
+    @property
+    def report_dir(self):
+        """The reports/ directory the analysis writes to."""
+        from main import get_repo_name
+
+        return Path('reports') / (get_repo_name(self.target) if self.kind == 'repo' else f"user_{self.target}")
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATUSES
+
+    def stop_reason(self):
+        """Returns why the job should stop now, if it should."""
+        if self.cancel_requested:
+            return 'Cancelled'
+        if self.timeout and self.started and time.time() - self.started > self.timeout:
+            return 'Timed out'
+        return None
+
+    def handle_event(self, event):
+        """Records a progress event of the job's analysis."""
+        with self.changed:
+            self.event = event
+            if event.summary is not None:
+                self.summary = event.summary
+            self.message = event.message
+            self.percentage = round(event.percentage, 1)
+            self.version += 1
+            self.changed.notify_all()
+
+    def set_status(self, status, message=None, percentage=None):
+        with self.changed:
+            self.status = status
+            if message is not None:
+                self.message = message
+            if percentage is not None:
+                self.percentage = percentage
+            if not self.active:
+                self.finished = time.time()
+            self.version += 1
+            self.changed.notify_all()
+
+    def to_dict(self):
+        data = {
+            'id': self.id,
+            'kind': self.kind,
+            'target': self.target,
+            'lang': self.lang,
+            'status': self.status,
+            'message': self.message,
+            'percentage': self.percentage
+        }
+        if self.event:
+            event = self.event.to_dict()
+            data.update({key: event[key] for key in ('stage', 'done', 'total', 'unit', 'elapsed')})
+        if self.summary:
+            data['summary'] = self.summary
+        return data
+
+    def iter_updates(self, keepalive=15):
+        """Yields the job as a dict whenever it changes, and None every `keepalive` seconds without changes.
+
+        Stops after the update that shows the job finished.
+        """
+        seen = None
+        while True:
+            with self.changed:
+                self.changed.wait_for(lambda: self.version != seen, timeout=keepalive)
+                if self.version == seen:
+                    data = None
+                else:
+                    seen = self.version
+                    data = self.to_dict()
+            yield data
+            if data is not None and data['status'] not in ACTIVE_STATUSES:
+                return
+
+
+def run_analysis(func, args, events):
+    """Runs one analysis in a job's own process, sending its progress events and outcome to `events`.
+
+    The process leads its own process group, so the job manager can kill it
+    with its git children. SIGTERM stops the analysis like a cancelled job
+    always did: it still cleans up, and a stop during cleanup waits for it.
+    """
+    if os.name != 'nt':
+        os.setsid()
+    stage = [None]
+
+    def on_event(event):
+        stage[0] = event.stage
+        events.put(('event', event))
+
+    def stop(signum, frame):
+        if stage[0] in FINAL_STAGES:
+            return
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        # A hung clone or fetch only returns once its git process is gone.
+        os.killpg(0, signal.SIGTERM)
+        raise JobCancelled()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        func(*args, progress_callback=on_event)
+        events.put(('done', None))
+    except JobCancelled:
+        events.put(('stopped', None))
+    except Exception as e:
+        events.put(('error', str(e)))
+
+
+def kill_analysis(proc):
+    """Kills a job's process and whatever git processes it left in its process group."""
+    if os.name == 'nt':
+        proc.kill()
+    else:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            # The group is gone, or the process had not made it yet.
+            proc.kill()
+    proc.join()
+
+
+def watch_analysis(job, func, args):
+    """Runs a job's analysis in a child process and stops it from outside when the job is cancelled or times out.
+
+    Cancellation and QGIT_JOB_TIMEOUT no longer depend on the analysis
+    reporting progress: a clone that hangs without output is stopped too.
+    An analysis that does not stop within TERMINATE_GRACE_SECONDS is
+    killed, unless it is already cleaning up: removing a large temporary
+    clone may take longer, and killing it halfway would leave the clone behind.
+    Returns ('done' | 'stopped' | 'error', detail).
+    """
+    context = multiprocessing.get_context('spawn')
+    events = context.Queue()
+    proc = context.Process(target=run_analysis, args=(func, args, events), daemon=True)
+    proc.start()
+    reason = None
+    kill_at = None
+    while True:
+        try:
+            kind, value = events.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            kind, value = None, None
+        if kind == 'event':
+            job.handle_event(value)
+        elif kind is not None:
+            outcome = (kind, reason if kind == 'stopped' else value)
+            break
+        elif not proc.is_alive():
+            outcome = ('stopped', reason) if reason else ('error', f"the analysis exited with code {proc.exitcode}")
+            break
+        if reason is None:
+            reason = job.stop_reason()
+            if reason:
+                kill_at = time.time() + TERMINATE_GRACE_SECONDS
+                proc.terminate()
+        elif time.time() > kill_at and not (job.event and job.event.stage in FINAL_STAGES):
+            kill_analysis(proc)
+    proc.join(TERMINATE_GRACE_SECONDS)
+    kill_analysis(proc)
+    return outcome
+
+
+class JobManager:
+    """Runs analyses on a bounded thread pool and keeps their status by job ID.
+
+    Each analysis runs in a process of its own, so it can be stopped at any
+    time; the pool thread of the job relays its progress.
+    """
+
+    def __init__(self, max_workers=None, timeout=None):
+        self.max_workers = max_workers or int(os.environ.get('QGIT_WEB_WORKERS', 2))
+        self.timeout = timeout if timeout is not None else float(os.environ.get('QGIT_JOB_TIMEOUT', 0)) or None
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='qgit-job')
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        # Jobs writing the same reports/<repo>/ files (a/proj and b/proj too) run one at a time.
+        self.target_locks = defaultdict(threading.Lock)
+
+    def submit(self, kind, target, lang, func, *args):
+        """Queues an analysis, or returns the active job already doing the same one."""
+        job = Job(kind, target, lang, self.timeout)
+        with self.lock:
+            for existing in self.jobs.values():
+                if existing.active and existing.key == job.key:
+                    return existing
+            self.jobs[job.id] = job
+            self._forget_old_jobs()
+        job.future = self.executor.submit(self._run, job, func, args)
+        return job
+
+    def _run(self, job, func, args):
+        with self.lock:
+            target_lock = self.target_locks[job.report_dir]
+        with target_lock:
+            if job.cancel_requested:
+                job.set_status('Cancelled')
+                return
+            job.started = time.time()
+            job.set_status('Running', 'Starting analysis...')
+            outcome, detail = watch_analysis(job, func, args)
+            if outcome == 'done':
+                job.set_status('Complete', "Analysis complete! Reports saved in: reports", 100)
+            elif outcome == 'stopped':
+                job.set_status(detail, f"Analysis stopped: {detail}")
+            else:
+                job.set_status('Error', f"Error: {detail}", 0)
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        """Returns all known jobs, newest first."""
+        with self.lock:
+            return list(reversed(self.jobs.values()))
+
+    def cancel(self, job_id):
+        """Cancels a queued job right away, or asks a running one to stop at its next step."""
+        job = self.jobs.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.cancel_requested = True
+        if job.future and job.future.cancel():
+            job.set_status('Cancelled')
+        elif job.status == 'Running':
+            job.set_status('Running', "Stopping at the next step...")
+        return True
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in itertools.islice(finished, max(0, len(finished) - MAX_FINISHED_JOBS)):
+            del self.jobs[job_id]
@@ -0,0 +1,203 @@
+import re
+
+from blobs import prefetch_missing_blobs, read_blobs
+
+# Lowercased extension -> language
+EXTENSIONS = {
+    '.py': 'Python', '.pyw': 'Python', '.pyi': 'Python', '.pyx': 'Cython', '.ipynb': 'Jupyter Notebook',
+    '.js': 'JavaScript', '.mjs': 'JavaScript', '.cjs': 'JavaScript', '.jsx': 'JavaScript',
+    '.ts': 'TypeScript', '.mts': 'TypeScript', '.cts': 'TypeScript', '.tsx': 'TypeScript',
+    '.java': 'Java', '.kt': 'Kotlin', '.kts': 'Kotlin', '.scala': 'Scala', '.sc': 'Scala', '.groovy': 'Groovy',
+    '.gradle': 'Groovy', '.clj': 'Clojure', '.cljs': 'Clojure', '.cljc': 'Clojure', '.edn': 'Clojure',
+    '.c': 'C', '.h': 'C', '.cpp': 'C++', '.cc': 'C++', '.cxx': 'C++', '.c++': 'C++', '.hpp': 'C++', '.hh': 'C++',
+    '.hxx': 'C++', '.ipp': 'C++', '.inl': 'C++', '.m': 'Objective-C', '.mm': 'Objective-C++',
+    '.cs': 'C#', '.csx': 'C#', '.fs': 'F#', '.fsi': 'F#', '.fsx': 'F#', '.vb': 'Visual Basic',
+    '.go': 'Go', '.rs': 'Rust', '.swift': 'Swift', '.zig': 'Zig', '.nim': 'Nim', '.d': 'D', '.v': 'Verilog',
+    '.sv': 'SystemVerilog', '.vhd': 'VHDL', '.vhdl': 'VHDL', '.asm': 'Assembly', '.s': 'Assembly',
+    '.rb': 'Ruby', '.erb': 'Ruby', '.rake': 'Ruby', '.gemspec': 'Ruby', '.php': 'PHP', '.phtml': 'PHP',
+    '.pl': 'Perl', '.pm': 'Perl', '.t': 'Perl', '.lua': 'Lua', '.r': 'R', '.rmd': 'R', '.jl': 'Julia',
+    '.dart': 'Dart', '.ex': 'Elixir', '.exs': 'Elixir', '.erl': 'Erlang', '.hrl': 'Erlang',
+    '.hs': 'Haskell', '.lhs': 'Haskell', '.ml': 'OCaml', '.mli': 'OCaml', '.elm': 'Elm',
+    '.sh': 'Shell', '.bash': 'Shell', '.zsh': 'Shell', '.ksh': 'Shell', '.fish': 'Shell',
+    '.ps1': 'PowerShell', '.psm1': 'PowerShell', '.bat': 'Batchfile', '.cmd': 'Batchfile',
+    '.html': 'HTML', '.htm': 'HTML', '.xhtml': 'HTML', '.css': 'CSS', '.scss': 'SCSS', '.sass': 'Sass',
+    '.less': 'Less', '.vue': 'Vue', '.svelte': 'Svelte', '.astro': 'Astro',
+    '.sql': 'SQL', '.graphql': 'GraphQL', '.gql': 'GraphQL', '.proto': 'Protocol Buffers',
+    '.tf': 'HCL', '.hcl': 'HCL', '.nix': 'Nix', '.cmake': 'CMake', '.mk': 'Makefile', '.dockerfile': 'Dockerfile',
+    '.bzl': 'Starlark', '.sol': 'Solidity', '.cu': 'CUDA', '.cuh': 'CUDA', '.glsl': 'GLSL', '.hlsl': 'HLSL',
+    '.md': 'Markdown', '.markdown': 'Markdown', '.mdx': 'Markdown', '.rst': 'reStructuredText', '.tex': 'TeX',
+    '.adoc': 'AsciiDoc', '.txt': 'Text', '.json': 'JSON', '.jsonc': 'JSON', '.yaml': 'YAML', '.yml': 'YAML',
+    '.toml': 'TOML', '.ini': 'INI', '.cfg': 'INI', '.xml': 'XML', '.xsd': 'XML', '.xsl': 'XML', '.svg': 'SVG',
+    '.csv': 'CSV', '.tsv': 'CSV', '.csproj': 'XML', '.fsproj': 'XML', '.vbproj': 'XML', '.props': 'XML',
+}
+# Whole file names, checked before extensions (CMakeLists.txt is CMake, not Text)
+FILENAMES = {
+    'Makefile': 'Makefile', 'makefile': 'Makefile', 'GNUmakefile': 'Makefile', 'Dockerfile': 'Dockerfile',
+    'Containerfile': 'Dockerfile', 'CMakeLists.txt': 'CMake', 'meson.build': 'Meson', 'Jenkinsfile': 'Groovy',
+    'Rakefile': 'Ruby', 'Gemfile': 'Ruby', 'Vagrantfile': 'Ruby', 'Podfile': 'Ruby', 'Fastfile': 'Ruby',
+    'Brewfile': 'Ruby', 'BUILD': 'Starlark', 'BUILD.bazel': 'Starlark', 'WORKSPACE': 'Starlark',
+    'Tiltfile': 'Starlark', 'SConstruct': 'Python', 'SConscript': 'Python', 'Snakefile': 'Python',
+    'go.mod': 'Go Module', 'go.sum': 'Go Checksums',
+    '.bashrc': 'Shell', '.bash_profile': 'Shell', '.zshrc': 'Shell', '.profile': 'Shell',
+}
+# Interpreter named by a shebang line -> language
+INTERPRETERS = {
+    'python': 'Python', 'pypy': 'Python', 'node': 'JavaScript', 'nodejs': 'JavaScript', 'deno': 'TypeScript',
+    'ts-node': 'TypeScript', 'bun': 'JavaScript', 'sh': 'Shell', 'bash': 'Shell', 'zsh': 'Shell', 'ksh': 'Shell',
+    'dash': 'Shell', 'fish': 'Shell', 'ruby': 'Ruby', 'perl': 'Perl', 'php': 'PHP', 'lua': 'Lua', 'Rscript': 'R',
+    'julia': 'Julia', 'escript': 'Erlang', 'elixir': 'Elixir', 'runhaskell': 'Haskell', 'pwsh': 'PowerShell',
+    'tclsh': 'Tcl', 'awk': 'Awk', 'gawk': 'Awk', 'make': 'Makefile',
+}
+# (manifest file name, or extension starting with '.', framework, pattern its contents must match or None)
+FRAMEWORK_RULES = [
+    ('package.json', 'Node.js', None),
+    ('package.json', 'React', rb'"react"\s*:'),
+    ('package.json', 'Next.js', rb'"next"\s*:'),
+    ('package.json', 'Vue.js', rb'"vue"\s*:'),
+    ('package.json', 'Angular', rb'"@angular/core"\s*:'),
+    ('package.json', 'Svelte', rb'"svelte"\s*:'),
+    ('package.json', 'Express', rb'"express"\s*:'),
+    ('package.json', 'NestJS', rb'"@nestjs/core"\s*:'),
+    ('deno.json', 'Deno', None),
+    ('requirements.txt', 'Python (Pip)', None),
+    ('pyproject.toml', 'Python (pyproject)', None),
+    ('Pipfile', 'Python (Pipenv)', None),
+    *((manifest, framework, pattern)
+      for manifest in ('requirements.txt', 'pyproject.toml', 'Pipfile', 'setup.py', 'setup.cfg')
+      for framework, pattern in [('Django', rb'(?i)\bdjango\b'), ('Flask', rb'(?i)\bflask\b'),
+                                 ('FastAPI', rb'(?i)\bfastapi\b')]),
+    ('pom.xml', 'Maven (Java)', None),
+    ('build.gradle', 'Gradle', None),
+    ('build.gradle.kts', 'Gradle', None),
+    *((manifest, framework, pattern)
+      for manifest in ('pom.xml', 'build.gradle', 'build.gradle.kts')
+      for framework, pattern in [('Spring Boot', rb'spring-boot|org\.springframework\.boot'),
+                                 ('Android', rb'com\.android\.(?:application|library)')]),
+    ('Gemfile', 'Bundler (Ruby)', None),
+    ('Gemfile', 'Ruby on Rails', rb'''gem\s+['"]rails['"]'''),
+    ('Cargo.toml', 'Rust (Cargo)', None),
+    ('Cargo.toml', 'Actix Web', rb'(?m)^actix-web\s*='),
+    ('Cargo.toml', 'Rocket', rb'(?m)^rocket\s*='),
+    ('go.mod', 'Go Modules', None),
+    ('go.mod', 'Gin', rb'github\.com/gin-gonic/gin'),
+    ('go.mod', 'Echo', rb'github\.com/labstack/echo'),
+    ('composer.json', 'Composer (PHP)', None),
+    ('composer.json', 'Laravel', rb'"laravel/framework"'),
+    ('composer.json', 'Symfony', rb'"symfony/framework-bundle"'),
+    ('pubspec.yaml', 'Dart (pub)', None),
+    ('pubspec.yaml', 'Flutter', rb'(?m)^\s+sdk:\s*flutter'),
+    ('mix.exs', 'Elixir (Mix)', None),
+    ('mix.exs', 'Phoenix', rb':phoenix\b'),
+    ('.csproj', '.NET', None),
+    ('.fsproj', '.NET', None),
+    ('.csproj', 'ASP.NET Core', rb'Microsoft\.NET\.Sdk\.Web'),
+    ('Package.swift', 'Swift Package Manager', None),
+    ('CMakeLists.txt', 'CMake', None),
+    ('Dockerfile', 'Docker', None),
+    ('docker-compose.yml', 'Docker Compose', None),
+    ('docker-compose.yaml', 'Docker Compose', None),
+]
+# Manifests of bundled dependencies say nothing about the repository's own code.
+VENDORED = re.compile(r'(?:^|/)(?:node_modules|bower_components|vendor)/')
+SHEBANG = re.compile(rb'#![ \t]*(\S+)(?:[ \t]+(\S+))?')
+# Larger manifests and scripts are not read.
+MAX_READ_BYTES = 1024 * 1024
+# Only the start of a script is read for its shebang line.
+SHEBANG_BYTES = 512
+
+
+def compile_rules(rules):
+    """Groups framework rules by manifest name and by manifest extension, with compiled patterns."""
+    names, extensions = {}, {}
+    for manifest, framework, pattern in rules:
+        group = extensions if manifest.startswith('.') else names
+        group.setdefault(manifest, []).append((framework, pattern and re.compile(pattern)))
+    return names, extensions
+
+
+MANIFESTS, MANIFEST_EXTENSIONS = compile_rules(FRAMEWORK_RULES)
+
+
+def shebang_language(contents):
+    """Returns the language of a script from its shebang line (#!/usr/bin/env python3), or None."""
+    match = SHEBANG.match(contents)
+    if not match:
+        return None
+    program, argument = match.groups()
+    interpreter = program.rsplit(b'/', 1)[-1]
+    if interpreter == b'env' and argument:
+        interpreter = argument
+    # python3.12 -> python
+    return INTERPRETERS.get(interpreter.decode('utf-8', 'replace').rstrip('0123456789.'))
+
+
+def classify_paths(entries):
+    """Classifies ls-tree entries (path, mode, type, sha, size) in one pass over their file names.
+
+    Returns ({path: language}, manifests, scripts): paths no rule matched
+    are left out, manifests are (path, sha, size, framework rules) and
+    scripts the (path, sha, size) of extensionless files whose shebang may
+    tell their language.
+    """
+    languages = {}
+    manifests = []
+    scripts = []
+    filenames, extensions = FILENAMES, EXTENSIONS
+    for path, _, obj_type, sha, size in entries:
+        name = path[path.rfind('/') + 1:]
+        dot = name.rfind('.')
+        extension = name[dot:].lower() if dot > 0 else ''
+        language = filenames.get(name) or extensions.get(extension)
+        if language:
+            languages[path] = language
+        if obj_type != 'blob':
+            continue
+        rules = MANIFESTS.get(name) or MANIFEST_EXTENSIONS.get(extension)
+        if rules and not VENDORED.search(path):
+            manifests.append((path, sha, size, rules))
+        elif not language and not extension and size <= MAX_READ_BYTES:
+            scripts.append((path, sha, size))
+    return languages, manifests, scripts
+
+
+def detect_frameworks(manifests, contents):
+    """Returns {framework: indicator} from the manifests found and the contents read of some of them.
+
+    The indicator is the shallowest manifest that shows the framework,
+    with the number of others after it.
+    """
+    found = {}
+    for path, sha, _, rules in manifests:
+        for framework, pattern in rules:
+            if pattern is None or (sha in contents and pattern.search(contents[sha])):
+                found.setdefault(framework, set()).add(path)
+    frameworks = {}
+    for _, framework, _ in FRAMEWORK_RULES:
+        if framework in found and framework not in frameworks:
+            paths = sorted(found[framework], key=lambda path: (path.count('/'), path))
+            frameworks[framework] = paths[0] + (f" (+{len(paths) - 1})" if len(paths) > 1 else '')
+    return frameworks
+
+
+def classify_tree(repo, entries, partial_clone=False):
+    """Detects the language of every file and the frameworks of a commit's tree.
+
+    File names decide most languages; only manifests whose framework
+    rules look at their contents and the first bytes of extensionless
+    scripts (for their shebang) are read, through `git cat-file --batch`.
+    A partial clone downloads them first. Returns ({path: language},
+    {framework: indicator}).
+    """
+    languages, manifests, scripts = classify_paths(entries)
+    wanted = {sha for _, sha, size, rules in manifests
+              if size <= MAX_READ_BYTES and any(pattern for _, pattern in rules)}
+    script_shas = {sha for _, sha, _ in scripts}
+    if partial_clone:
+        prefetch_missing_blobs(repo, wanted | script_shas)
+    contents = read_blobs(repo, sorted(wanted))
+    heads = read_blobs(repo, sorted(script_shas), SHEBANG_BYTES)
+    for path, sha, _ in scripts:
+        language = shebang_language(heads.get(sha, b''))
+        if language:
+            languages[path] = language
+    return languages, detect_frameworks(manifests, contents)
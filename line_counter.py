@@ -0,0 +1,154 @@
+import itertools
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import git
+
+from blobs import count_lines, iter_blob_chunks
+
+MAX_FILE_BYTES = 50 * 1024 * 1024
+# Same window git looks at when it decides whether a file is binary.
+BINARY_SNIFF_BYTES = 8000
+READ_SIZE = 1 << 20
+SYMLINK_MODE = '120000'
+
+
+def count_chunks(chunks):
+    """Counts lines in a stream of byte chunks, or returns None if the start of the stream contains a NUL."""
+    chunks = iter(chunks)
+    first = next(chunks, b'')
+    if b'\0' in first[:BINARY_SNIFF_BYTES]:
+        return None
+    return count_lines(itertools.chain([first], chunks))
+
+
+def count_blob(known, sha, read):
+    """Returns the lines of a blob (None if binary) from `known`, or counts `read()` and adds them to it."""
+    if known is not None and sha in known:
+        return known[sha]
+    lines = count_chunks(read())
+    if known is not None:
+        known[sha] = lines
+    return lines
+
+
+def read_chunks(path):
+    """Reads a file as raw byte chunks."""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def read_attributes(repo, paths):
+    """Returns the paths .gitattributes marks as binary, and those checked out through a filter or in another encoding.
+
+    Binary paths have `-diff`, which the `binary` macro sets. The checked-out
+    contents of the others may have other lines than their blob.
+    """
+    if not paths:
+        return set(), set()
+    result = subprocess.run(['git', 'check-attr', '-z', '--stdin', 'diff', 'filter', 'working-tree-encoding'],
+                            cwd=repo.working_tree_dir, input='\0'.join(paths) + '\0', capture_output=True, text=True, check=True)
+    fields = result.stdout.split('\0')
+    binary, converted = set(), set()
+    for i in range(0, len(fields) - 2, 3):
+        path, attribute, value = fields[i:i + 3]
+        if attribute == 'diff':
+            if value == 'unset':
+                binary.add(path)
+        elif value not in ('unspecified', 'unset'):
+            converted.add(path)
+    return binary, converted
+
+
+def count_worktree_lines(repo, paths, max_bytes=MAX_FILE_BYTES, workers=None, on_progress=None, blobs=None, known=None):
+    """Counts lines of checked-out files on a thread pool.
+
+    Returns ({path: lines}, {path: skip reason}); skipped files count as 0 lines.
+    `on_progress(done, total)` is called as files are counted. With `blobs`
+    ({path: blob sha}) and `known` ({blob sha: lines, None if binary}),
+    files whose blob is known are not read, and the others are added to it.
+    Files checked out through a filter (Git LFS, say) or in another encoding
+    are always read and never added, since `known` counts blob contents.
+    Line ending conversion does not change how many lines a file has.
+    """
+    binary, converted = read_attributes(repo, paths)
+
+    def count(path):
+        full_path = os.path.join(repo.working_tree_dir, path)
+        if path in binary:
+            return 0, 'binary'
+        if os.path.islink(full_path):
+            return 0, 'symlink'
+        if os.path.isdir(full_path):
+            return 0, 'submodule'
+        if os.path.getsize(full_path) > max_bytes:
+            return 0, 'too large'
+        sha = blobs.get(path) if blobs and path not in converted else None
+        lines = count_blob(known if sha else None, sha, lambda: read_chunks(full_path))
+        return (0, 'binary') if lines is None else (lines, None)
+
+    return _run_pool(paths, count, workers, on_progress)
+
+
+def count_tree_lines(repo, paths, tree_entries, max_bytes=MAX_FILE_BYTES, workers=None, on_progress=None, known=None):
+    """Counts lines of blobs in a repository without a working tree, on a thread pool.
+
+    Every worker thread streams through its own `git cat-file --batch`
+    process. Blobs in `known` ({blob sha: lines, None if binary}) are not
+    read; the others are added to it.
+    """
+    entries = {entry[0]: entry for entry in tree_entries}
+    local = threading.local()
+    thread_repos = []
+    lock = threading.Lock()
+
+    def thread_repo():
+        if not hasattr(local, 'repo'):
+            local.repo = git.Repo(repo.git_dir)
+            with lock:
+                thread_repos.append(local.repo)
+        return local.repo
+
+    def count(path):
+        _, mode, obj_type, sha, size = entries[path]
+        if obj_type != 'blob':
+            return 0, 'submodule'
+        if mode == SYMLINK_MODE:
+            return 0, 'symlink'
+        if size > max_bytes:
+            return 0, 'too large'
+        lines = count_blob(known, sha, lambda: iter_blob_chunks(thread_repo(), sha))
+        return (0, 'binary') if lines is None else (lines, None)
+
+    try:
+        return _run_pool(paths, count, workers, on_progress)
+    finally:
+        for opened in thread_repos:
+            opened.close()
+
+
+def _run_pool(paths, count, workers, on_progress=None):
+    """Maps `count` over paths on a thread pool and splits the results into line counts and skips."""
+    lines, skipped = {}, {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(count, path) for path in paths]
+        try:
+            for done, (path, future) in enumerate(zip(paths, futures), 1):
+                count_result, reason = future.result()
+                lines[path] = count_result
+                if reason:
+                    skipped[path] = reason
+                if on_progress:
+                    on_progress(done, len(paths))
+        except BaseException:
+            # Don't count the remaining files when the analysis is stopped.
+            for future in futures:
+                future.cancel()
+            raise
+    return lines, skipped
@@ -1,77 +1,215 @@
 import git
 import os
 import tempfile
-import shutil
 import sys
 import time
 from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import url2pathname
 from collections import defaultdict
 import itertools
-
-def build_tree_structure(file_data):
-    """Builds a tree structure from file paths."""
-    tree = {'dirs': {}, 'files': {}}
-    for file_path in file_data:
+import argparse
+import signal
+import cProfile
+from array import array
+from blobs import CLONE_MODES, clone_options, shallow_options, deepen_shallow_clone, list_tree, prefetch_missing_blobs
+from line_counter import MAX_FILE_BYTES, count_worktree_lines, count_tree_lines
+from mirror_cache import default_cache_dir, update_mirror
+from file_utils import safe_rmtree
+from blob_cache import default_cache_path, lookup_blobs, store_blobs
+from incremental import empty_state, load_state, save_state, resume_point, update_files, update_commits, update_ownership
+from artifact import AnalysisArtifact, open_artifact, read_meta
+from history import pin_date, window_args
+from sketch import HyperLogLog, precision_for_error
+from catalog import record_report
+from report_writer import ReportWriter
+from report_index import ReportIndexWriter
+from progress import ProgressReporter
+from instrumentation import save_run_summary
+from languages import classify_tree
+
+EMPTY_IDS = array('I')
+# Remote repositories that can be analyzed; anything else must be a local repository.
+REMOTE_URL_PREFIXES = ('https://github.com/', 'git@github.com:')
+# Owners listed per file and folder in ownership.md
+TOP_OWNERS = 3
+SUPPORTED_LANGS = ["EN", "TR", "IT", "FR", "ES", "DE"]
+
+class TreeNode:
+    """A file or directory of the folder tree; directories also hold child nodes."""
+    __slots__ = ('dirs', 'files', 'lines', 'commits', 'commit_count')
+
+    def __init__(self, lines=0, commits=EMPTY_IDS):
+        self.dirs = {}
+        self.files = {}
+        self.lines = lines
+        self.commits = commits
+        self.commit_count = count_commit_ids(commits)
+
+def count_commit_ids(commits):
+    """Counts the commits in a sorted id array or an int bitmap, or estimates them from a sketch."""
+    if isinstance(commits, HyperLogLog):
+        return commits.estimate()
+    if isinstance(commits, int):
+        return bin(commits).count('1')
+    return len(commits)
+
+def merge_commit_ids(parts):
+    """Unions commit id sets, keeping whichever of a sorted array or a bitmap is smaller."""
+    bitmap = 0
+    ids = set()
+    for part in parts:
+        if isinstance(part, int):
+            bitmap |= part
+        else:
+            ids.update(part)
+    universe = max(bitmap.bit_length(), max(ids) + 1 if ids else 0)
+    count = len(ids) if not bitmap else count_commit_ids(bitmap) + len(ids)
+    # A 32-bit id per member costs more than one bit per possible id once a node holds 1/32 of them.
+    if bitmap or count * 32 > universe:
+        bits = bytearray(bitmap.to_bytes((universe + 7) // 8, 'little'))
+        for commit_id in ids:
+            bits[commit_id >> 3] |= 1 << (commit_id & 7)
+        return int.from_bytes(bits, 'little')
+    return array('I', sorted(ids))
+
+def build_tree_structure(file_data, approximate=None):
+    """Builds a tree structure from file paths, interning commit SHAs to integer ids.
+
+    With `approximate` (a standard error such as 0.02) every directory gets
+    a HyperLogLog sketch of its commits instead, so its memory no longer
+    grows with history; files keep exact counts and add their commits to
+    the sketch of the directory holding them.
+    """
+    precision = precision_for_error(approximate) if approximate else None
+    new_node = (lambda: TreeNode(commits=HyperLogLog(precision))) if precision else TreeNode
+    commit_ids = {}
+    tree = new_node()
+    for file_path, data in file_data.items():
         parts = file_path.split('/')
         current = tree
         for part in parts[:-1]:
-            if part not in current['dirs']:
-                current['dirs'][part] = {'dirs': {}, 'files': {}}
-            current = current['dirs'][part]
-        current['files'][parts[-1]] = file_data[file_path]
+            if part not in current.dirs:
+                current.dirs[part] = new_node()
+            current = current.dirs[part]
+        if precision:
+            for sha in data['commits']:
+                current.commits.add(sha)
+            node = current.files[parts[-1]] = TreeNode(data['lines'])
+            node.commit_count = len(data['commits'])
+            continue
+        ids = sorted(commit_ids.setdefault(sha, len(commit_ids)) for sha in data['commits'])
+        current.files[parts[-1]] = TreeNode(data['lines'], array('I', ids))
     return tree
 
 def aggregate_tree(node):
-    """Aggregates lines of code and commits up the tree."""
-    total_lines = 0
-    all_commits = set()
-    for file_name, data in node['files'].items():
-        total_lines += data['lines']
-        all_commits.update(data['commits'])
-    for dir_name, subnode in node['dirs'].items():
-        sub_lines, sub_commits = aggregate_tree(subnode)
-        total_lines += sub_lines
-        all_commits.update(sub_commits)
-    node['lines'] = total_lines
-    node['commits'] = all_commits
-    return total_lines, all_commits
-
-def print_tree(node, level=0):
-    """Generates a pretty Markdown list for the tree structure."""
-    lines = []
-    dir_names = sorted(node['dirs'].keys())
-    file_names = sorted(node['files'].keys())
-
-    for dir_name in dir_names:
-        subnode = node['dirs'][dir_name]
-        lines.append(f"{'  ' * level}- {dir_name}/ (Lines: {subnode['lines']}, Commits: {len(subnode['commits'])})")
-        lines.extend(print_tree(subnode, level + 1))
-
-    for file_name in file_names:
-        data = node['files'][file_name]
-        lines.append(f"{'  ' * level}- `{file_name}` (Lines: {data['lines']}, Commits: {len(data['commits'])})")
+    """Aggregates lines of code and commits up the tree, children before parents."""
+    order = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        order.append(current)
+        stack.extend(current.dirs.values())
+    for current in reversed(order):
+        children = list(current.files.values()) + list(current.dirs.values())
+        current.lines = sum(child.lines for child in children)
+        if isinstance(current.commits, HyperLogLog):
+            # The files' commits went into the sketch while the tree was built.
+            for child in current.dirs.values():
+                current.commits.merge(child.commits)
+        else:
+            current.commits = merge_commit_ids(child.commits for child in children)
+        current.commit_count = count_commit_ids(current.commits)
+    return node.lines, node.commits
 
+def print_tree(node, level=0, approximate=False):
+    """Generates a pretty Markdown list for the tree structure; `approximate` marks folder commit counts as estimates."""
+    lines = []
+    stack = [(node, level)]
+    while stack:
+        entry, level = stack.pop()
+        if isinstance(entry, str):
+            lines.append(entry)
+            continue
+        pending = []
+        for dir_name in sorted(entry.dirs.keys()):
+            subnode = entry.dirs[dir_name]
+            pending.append((f"{'  ' * level}- {dir_name}/ (Lines: {subnode.lines}, Commits: {'~' if approximate else ''}{subnode.commit_count})", level))
+            pending.append((subnode, level + 1))
+        for file_name in sorted(entry.files.keys()):
+            data = entry.files[file_name]
+            pending.append((f"{'  ' * level}- `{file_name}` (Lines: {data.lines}, Commits: {data.commit_count})", level))
+        stack.extend(reversed(pending))
     return lines
 
-def safe_rmtree(path):
-    """Safely remove a directory tree, handling permission errors on Windows."""
-    def remove_readonly(func, path, _):
-        os.chmod(path, 0o777)
-        func(path)
-
-    for _ in range(5):
-        try:
-            shutil.rmtree(path, onerror=remove_readonly)
-            break
-        except PermissionError:
-            time.sleep(1)
-    else:
-        print(f"Warning: Could not fully remove temporary directory {path}", file=sys.stderr)
+def iter_folders(node):
+    """Yields (path, node) for every directory below the root of the tree."""
+    stack = [('', node)]
+    while stack:
+        path, current = stack.pop()
+        for dir_name, subnode in current.dirs.items():
+            sub_path = f"{path}/{dir_name}" if path else dir_name
+            yield sub_path, subnode
+            stack.append((sub_path, subnode))
+
+def load_ownership(conn):
+    """Returns the surviving lines per author of every file and of every folder ('' is the whole repository).
+
+    Lines last changed by a commit outside the analyzed history window belong to no one.
+    """
+    files = defaultdict(dict)
+    folders = defaultdict(lambda: defaultdict(int))
+    for row in conn.execute("SELECT path, author, SUM(lines) AS lines FROM blame JOIN commits USING (sha) GROUP BY path, author"):
+        files[row['path']][row['author']] = row['lines']
+        parts = row['path'].split('/')
+        for depth in range(len(parts)):
+            folders['/'.join(parts[:depth])][row['author']] += row['lines']
+    return files, folders
+
+def format_owners(owners):
+    """Formats the largest owners of a file or folder as 'name (share%)'."""
+    total = sum(owners.values())
+    ranked = sorted(owners.items(), key=lambda owner: (-owner[1], owner[0]))
+    text = ', '.join(f"{name} ({lines / total * 100:.1f}%)" for name, lines in ranked[:TOP_OWNERS])
+    return text + (f", +{len(ranked) - TOP_OWNERS}" if len(ranked) > TOP_OWNERS else '')
+
+def load_tree(conn):
+    """Rebuilds the folder tree, with lines and commit counts, from an analysis artifact."""
+    tree = TreeNode()
+
+    def node_at(parts):
+        current = tree
+        for part in parts:
+            if part not in current.dirs:
+                current.dirs[part] = TreeNode()
+            current = current.dirs[part]
+        return current
+
+    for row in conn.execute("SELECT path, lines, commit_count FROM folders"):
+        node = node_at(row['path'].split('/'))
+        node.lines, node.commit_count = row['lines'], row['commit_count']
+    for row in conn.execute("SELECT path, lines, commit_count FROM files"):
+        parts = row['path'].split('/')
+        node = node_at(parts[:-1]).files[parts[-1]] = TreeNode(row['lines'])
+        node.commit_count = row['commit_count']
+    return tree
 
 def get_repo_name(repo_url):
-    """Extracts the repository name from the URL."""
+    """Extracts the repository name from the URL or local path."""
+    local_path = local_repo_path(repo_url)
+    if local_path:
+        # A checkout's .git directory is named after the checkout.
+        return (local_path.parent if local_path.name == '.git' else local_path).name.replace('.git', '')
     return repo_url.split('/')[-1].replace('.git', '')
 
+def local_repo_path(repo_url):
+    """Returns the directory of a file:// URL or local repository path, or None for other URLs."""
+    if repo_url.startswith('file://'):
+        return Path(url2pathname(urlparse(repo_url).path)).resolve()
+    if os.path.isdir(repo_url):
+        return Path(repo_url).resolve()
+    return None
+
 def get_language_labels(lang):
     """Returns labels for Markdown reports based on the selected language."""
     labels = {
@@ -98,7 +236,16 @@ def get_language_labels(lang):
             "contributors_headers": ["Contributor", "GitHub Link", "Lines of Code", "Commits"],
             "languages_headers": ["Language", "Lines of Code", "Percentage"],
             "frameworks_headers": ["Framework", "Indicator File"],
-            "activity_headers": ["Month", "Commits"]
+            "activity_headers": ["Month", "Commits"],
+            "skipped_title": "Skipped Files",
+            "skipped_headers": ["File", "Reason"],
+            "window": {"title": "History Window", "since": "since {}", "until": "until {}", "max_commits": "last {} commits"},
+            "approximate_note": "Folder commit counts (~) are estimates from HyperLogLog sketches, with a standard error of ±{error:.1f}%.",
+            "ownership_title": "Code Ownership",
+            "ownership_headers": ["Author", "Surviving Lines", "Share"],
+            "ownership_folders_title": "Ownership by Folder",
+            "ownership_files_title": "Ownership by File",
+            "ownership_path_headers": ["Path", "Surviving Lines", "Owners"]
         },
         "TR": {
             "repo_info_title": "Depo Bilgileri",
@@ -123,7 +270,16 @@ def get_language_labels(lang):
             "contributors_headers": ["Katkıda Bulunan", "GitHub Bağlantısı", "Kod Satırları", "Commit Sayısı"],
             "languages_headers": ["Dil", "Kod Satırları", "Yüzde"],
             "frameworks_headers": ["Çerçeve", "Gösterge Dosyası"],
-            "activity_headers": ["Ay", "Commit Sayısı"]
+            "activity_headers": ["Ay", "Commit Sayısı"],
+            "skipped_title": "Atlanan Dosyalar",
+            "skipped_headers": ["Dosya", "Neden"],
+            "window": {"title": "Geçmiş Aralığı", "since": "{} tarihinden beri", "until": "{} tarihine kadar", "max_commits": "son {} commit"},
+            "approximate_note": "Klasör commit sayıları (~) HyperLogLog taslaklarından elde edilen tahminlerdir; standart hata ±%{error:.1f}.",
+            "ownership_title": "Kod Sahipliği",
+            "ownership_headers": ["Yazar", "Kalan Satırlar", "Pay"],
+            "ownership_folders_title": "Klasöre Göre Sahiplik",
+            "ownership_files_title": "Dosyaya Göre Sahiplik",
+            "ownership_path_headers": ["Yol", "Kalan Satırlar", "Sahipler"]
         },
         "IT": {
             "repo_info_title": "Informazioni sul Repository",
@@ -148,7 +304,16 @@ def get_language_labels(lang):
             "contributors_headers": ["Contributore", "Link GitHub", "Linee di Codice", "Commit"],
             "languages_headers": ["Linguaggio", "Linee di Codice", "Percentuale"],
             "frameworks_headers": ["Framework", "File Indicatore"],
-            "activity_headers": ["Mese", "Commit"]
+            "activity_headers": ["Mese", "Commit"],
+            "skipped_title": "File Ignorati",
+            "skipped_headers": ["File", "Motivo"],
+            "window": {"title": "Finestra della Cronologia", "since": "dal {}", "until": "fino al {}", "max_commits": "ultimi {} commit"},
+            "approximate_note": "I conteggi dei commit delle cartelle (~) sono stime da sketch HyperLogLog, con un errore standard di ±{error:.1f}%.",
+            "ownership_title": "Proprietà del Codice",
+            "ownership_headers": ["Autore", "Righe Superstiti", "Quota"],
+            "ownership_folders_title": "Proprietà per Cartella",
+            "ownership_files_title": "Proprietà per File",
+            "ownership_path_headers": ["Percorso", "Righe Superstiti", "Proprietari"]
         },
         "FR": {
             "repo_info_title": "Informations sur le Dépôt",
@@ -173,7 +338,16 @@ def get_language_labels(lang):
             "contributors_headers": ["Contributeur", "Lien GitHub", "Lignes de Code", "Commits"],
             "languages_headers": ["Langage", "Lignes de Code", "Pourcentage"],
             "frameworks_headers": ["Framework", "Fichier Indicateur"],
-            "activity_headers": ["Mois", "Commits"]
+            "activity_headers": ["Mois", "Commits"],
+            "skipped_title": "Fichiers Ignorés",
+            "skipped_headers": ["Fichier", "Raison"],
+            "window": {"title": "Fenêtre d'Historique", "since": "depuis le {}", "until": "jusqu'au {}", "max_commits": "{} derniers commits"},
+            "approximate_note": "Les nombres de commits des dossiers (~) sont des estimations issues de sketches HyperLogLog, avec une erreur type de ±{error:.1f} %.",
+            "ownership_title": "Propriété du Code",
+            "ownership_headers": ["Auteur", "Lignes Survivantes", "Part"],
+            "ownership_folders_title": "Propriété par Dossier",
+            "ownership_files_title": "Propriété par Fichier",
+            "ownership_path_headers": ["Chemin", "Lignes Survivantes", "Propriétaires"]
         },
         "ES": {
             "repo_info_title": "Información del Repositorio",
@@ -198,7 +372,16 @@ def get_language_labels(lang):
             "contributors_headers": ["Contribuidor", "Enlace GitHub", "Líneas de Código", "Commits"],
             "languages_headers": ["Lenguaje", "Líneas de Código", "Porcentaje"],
             "frameworks_headers": ["Framework", "Archivo Indicador"],
-            "activity_headers": ["Mes", "Commits"]
+            "activity_headers": ["Mes", "Commits"],
+            "skipped_title": "Archivos Omitidos",
+            "skipped_headers": ["Archivo", "Motivo"],
+            "window": {"title": "Ventana del Historial", "since": "desde {}", "until": "hasta {}", "max_commits": "últimos {} commits"},
+            "approximate_note": "Los recuentos de commits de las carpetas (~) son estimaciones de sketches HyperLogLog, con un error estándar de ±{error:.1f}%.",
+            "ownership_title": "Propiedad del Código",
+            "ownership_headers": ["Autor", "Líneas Supervivientes", "Porcentaje"],
+            "ownership_folders_title": "Propiedad por Carpeta",
+            "ownership_files_title": "Propiedad por Archivo",
+            "ownership_path_headers": ["Ruta", "Líneas Supervivientes", "Propietarios"]
         },
         "DE": {
             "repo_info_title": "Repository-Informationen",
@@ -223,219 +406,366 @@ def get_language_labels(lang):
             "contributors_headers": ["Mitwirkender", "GitHub-Link", "Codezeilen", "Commits"],
             "languages_headers": ["Sprache", "Codezeilen", "Prozentsatz"],
             "frameworks_headers": ["Framework", "Indikator-Datei"],
-            "activity_headers": ["Monat", "Commits"]
+            "activity_headers": ["Monat", "Commits"],
+            "skipped_title": "Übersprungene Dateien",
+            "skipped_headers": ["Datei", "Grund"],
+            "window": {"title": "Verlaufsfenster", "since": "seit {}", "until": "bis {}", "max_commits": "letzte {} Commits"},
+            "approximate_note": "Die Commit-Zahlen der Ordner (~) sind Schätzungen aus HyperLogLog-Sketches mit einem Standardfehler von ±{error:.1f} %.",
+            "ownership_title": "Code-Eigentümerschaft",
+            "ownership_headers": ["Autor", "Verbleibende Zeilen", "Anteil"],
+            "ownership_folders_title": "Eigentümerschaft nach Ordner",
+            "ownership_files_title": "Eigentümerschaft nach Datei",
+            "ownership_path_headers": ["Pfad", "Verbleibende Zeilen", "Eigentümer"]
         }
     }
     return labels.get(lang.upper(), labels["EN"])
 
-def print_progress(step, total_steps, message, spinner_cycle):
-    """Prints progress with percentage, progress bar, and spinner."""
-    percentage = (step / total_steps) * 100
-    bar_length = 20
-    filled = int(bar_length * step // total_steps)
-    bar = '█' * filled + ' ' * (bar_length - filled)
-    spinner = next(spinner_cycle)
-    sys.stdout.write(f"\r{message} {spinner} [{bar}] {percentage:.1f}%")
-    sys.stdout.flush()
-
-def detect_languages(file_data):
-    """Detects programming languages based on file extensions."""
-    language_map = {
-        '.py': 'Python', '.js': 'JavaScript', '.java': 'Java', '.cpp': 'C++', '.c': 'C',
-        '.cs': 'C#', '.rb': 'Ruby', '.php': 'PHP', '.go': 'Go', '.rs': 'Rust',
-        '.ts': 'TypeScript', '.html': 'HTML', '.css': 'CSS', '.swift': 'Swift'
-    }
+def detect_languages(file_data, file_languages, skipped=()):
+    """Adds up the lines of every language; files no rule recognizes count as Unknown.
+
+    Skipped files (binary or too large) are left out of the languages.
+    """
     languages = defaultdict(int)
     total_lines = sum(data['lines'] for data in file_data.values())
     for file_path, data in file_data.items():
-        ext = os.path.splitext(file_path)[1]
-        lang = language_map.get(ext, 'Unknown')
-        languages[lang] += data['lines']
+        if file_path not in skipped:
+            languages[file_languages.get(file_path, 'Unknown')] += data['lines']
     return languages, total_lines
 
-def detect_frameworks(tracked_files):
-    """Detects frameworks based on common files."""
-    frameworks = {}
-    for file_path in tracked_files:
-        if file_path == 'package.json':
-            frameworks['Node.js'] = 'package.json'
-        elif file_path == 'requirements.txt':
-            frameworks['Python (Pip)'] = 'requirements.txt'
-        elif file_path == 'pom.xml':
-            frameworks['Maven (Java)'] = 'pom.xml'
-        elif file_path == 'Gemfile':
-            frameworks['Ruby on Rails'] = 'Gemfile'
-        elif file_path == 'Cargo.toml':
-            frameworks['Rust (Cargo)'] = 'Cargo.toml'
-    return frameworks
-
-def analyze_repo(repo_url, lang="EN"):
-    """Analyzes the GitHub repository and generates Markdown reports."""
-    total_steps = 10
-    step = 0
-    spinner = itertools.cycle(['|', '/', '-', '\\'])
-    print_progress(step, total_steps, "📋 Starting repository analysis", spinner)
-    step += 1
-    temp_dir = tempfile.mkdtemp()
-    repo_name = get_repo_name(repo_url)
-    report_dir = Path('reports') / repo_name
-    report_dir.mkdir(parents=True, exist_ok=True)
+def render_reports(report_dir, lang="EN"):
+    """Writes the Markdown reports of an analyzed repository from its analysis artifact.
 
+    Reports can be rendered again in another language without analyzing the
+    repository again. Commits are streamed from the artifact, so memory stays
+    flat however long the history is. The byte ranges of the rows of
+    timeline.md and contributors.md are saved to report_index.sqlite, so the
+    web interface can show them page by page.
+    """
+    labels = get_language_labels(lang)
+    signature = f"\n---\nGenerated with [Q-Git](https://github.com/QLineTech/Q-Git) on {time.strftime('%Y-%m-%d %H:%M:%S')}"
+    conn = open_artifact(report_dir)
+    # Report bodies kept for full_report.md
+    sections = {}
+    index = ReportIndexWriter(report_dir)
     try:
-        labels = get_language_labels(lang)
-
-        print_progress(step, total_steps, "🔗 Validating repository URL", spinner)
-        step += 1
-        if not (repo_url.startswith('https://github.com/') or repo_url.startswith('git@github.com:')):
-            raise ValueError("Invalid GitHub URL. Use HTTPS (https://github.com/...) or SSH (git@github.com:...) format.")
-        clone_url = repo_url + '.git' if repo_url.startswith('https://') and not repo_url.endswith('.git') else repo_url
-
-        print_progress(step, total_steps, "📥 Cloning repository", spinner)
-        step += 1
-        git.Repo.clone_from(clone_url, temp_dir)
-        repo = git.Repo(temp_dir)
-
-        print_progress(step, total_steps, "📄 Collecting tracked files", spinner)
-        step += 1
-        tracked_files = [f for f in repo.git.ls_files().split('\n') if f]
-
-        print_progress(step, total_steps, "📊 Analyzing files and commits", spinner)
-        step += 1
-        file_data = {}
-        for file_path in tracked_files:
-            with open(os.path.join(temp_dir, file_path), 'r', encoding='utf-8', errors='ignore') as f:
-                lines = sum(1 for line in f)
-            commits = set(repo.git.log('--follow', '--pretty=format:%H', file_path).split('\n'))
-            file_data[file_path] = {'lines': lines, 'commits': commits}
-
-        print_progress(step, total_steps, "🌳 Building folder structure", spinner)
-        step += 1
-        tree = build_tree_structure(file_data)
-        aggregate_tree(tree)
-
-        print_progress(step, total_steps, "⏳ Fetching commit history", spinner)
-        step += 1
-        commits = list(repo.iter_commits())
-        commits.reverse()
-        authors = set(commit.author.name for commit in commits)
-
-        print_progress(step, total_steps, "🔍 Analyzing languages and frameworks", spinner)
-        step += 1
-        languages, total_lines = detect_languages(file_data)
-        frameworks = detect_frameworks(tracked_files)
-
-        contributor_data = defaultdict(lambda: {'commits': [], 'lines_added': 0, 'lines_removed': 0})
-        for commit in commits:
-            author = commit.author.name
-            stats = commit.stats.total
-            contributor_data[author]['commits'].append({
-                'date': commit.committed_datetime.strftime("%Y-%m-%d %H:%M:%S"),
-                'message': commit.message.strip().replace('\n', ' '),
-                'lines_added': stats['insertions'],
-                'lines_removed': stats['deletions']
-            })
-            contributor_data[author]['lines_added'] += stats['insertions']
-            contributor_data[author]['lines_removed'] += stats['deletions']
-
-        signature = f"\n---\nGenerated with [Q-Git](https://github.com/QLineTech/Q-Git) on {time.strftime('%Y-%m-%d %H:%M:%S')}"
-
-        print_progress(step, total_steps, "📝 Generating reports", spinner)
-        step += 1
-        with open(report_dir / 'repo_info.md', 'w', encoding='utf-8') as f:
+        total_lines = conn.execute("SELECT COALESCE(SUM(lines), 0) FROM files").fetchone()[0]
+        commit_count = conn.execute("SELECT COUNT(*) FROM commits").fetchone()[0]
+        contributor_count = conn.execute("SELECT COUNT(*) FROM authors").fetchone()[0]
+        first_date = conn.execute("SELECT date FROM commits ORDER BY seq LIMIT 1").fetchone()
+        last_date = conn.execute("SELECT date FROM commits ORDER BY seq DESC LIMIT 1").fetchone()
+        meta = read_meta(conn)
+        window = [labels['window'][key].format(meta[key]) for key in ('since', 'until', 'max_commits') if meta.get(key)]
+
+        sections['repo_info'] = ReportWriter(report_dir / 'repo_info.md', signature)
+        with sections['repo_info'] as f:
             f.write(f"# {labels['repo_info_title']}\n\n")
             f.write("| Metric                | Value                                      |\n")
             f.write("|-----------------------|--------------------------------------------|\n")
-            f.write(f"| {labels['metrics']['total_lines']}  | {tree['lines']}                           |\n")
-            f.write(f"| {labels['metrics']['total_commits']}        | {len(commits)}                            |\n")
-            f.write(f"| {labels['metrics']['contributors']}         | {len(authors)}                            |\n")
-            f.write(f"| {labels['metrics']['creation_date']}        | {commits[0].committed_datetime.strftime('%Y-%m-%d %H:%M:%S')} |\n")
-            f.write(f"| {labels['metrics']['last_update']}          | {commits[-1].committed_datetime.strftime('%Y-%m-%d %H:%M:%S')} |\n")
+            f.write(f"| {labels['metrics']['total_lines']}  | {total_lines}                           |\n")
+            f.write(f"| {labels['metrics']['total_commits']}        | {commit_count}                            |\n")
+            f.write(f"| {labels['metrics']['contributors']}         | {contributor_count}                            |\n")
+            f.write(f"| {labels['metrics']['creation_date']}        | {first_date['date'] if first_date else None} |\n")
+            f.write(f"| {labels['metrics']['last_update']}          | {last_date['date'] if last_date else None} |\n")
+            if window:
+                f.write(f"| {labels['window']['title']}       | {', '.join(window)} |\n")
             f.write(f"\n## {labels['languages_title']}\n\n")
             f.write(f"| {labels['languages_headers'][0]} | {labels['languages_headers'][1]} | {labels['languages_headers'][2]} |\n")
             f.write("|------------|------------------|-----------------|\n")
-            for lang_name, lines in sorted(languages.items(), key=lambda x: x[1], reverse=True):
-                percentage = (lines / total_lines) * 100 if total_lines > 0 else 0
-                f.write(f"| {lang_name} | {lines} | {percentage:.2f}% |\n")
+            for row in conn.execute("SELECT name, lines FROM languages ORDER BY lines DESC, rowid"):
+                percentage = (row['lines'] / total_lines) * 100 if total_lines > 0 else 0
+                f.write(f"| {row['name']} | {row['lines']} | {percentage:.2f}% |\n")
             f.write(f"\n## {labels['frameworks_title']}\n\n")
             f.write(f"| {labels['frameworks_headers'][0]} | {labels['frameworks_headers'][1]} |\n")
             f.write("|------------|------------------|\n")
-            for framework, indicator in frameworks.items():
-                f.write(f"| {framework} | {indicator} |\n")
-            f.write(signature)
+            for row in conn.execute("SELECT name, indicator FROM frameworks ORDER BY rowid"):
+                f.write(f"| {row['name']} | {row['indicator']} |\n")
+            f.write(f"\n## {labels['skipped_title']}\n\n")
+            f.write(f"| {labels['skipped_headers'][0]} | {labels['skipped_headers'][1]} |\n")
+            f.write("|------------|------------------|\n")
+            for row in conn.execute("SELECT path, skipped FROM files WHERE skipped IS NOT NULL ORDER BY path"):
+                f.write(f"| `{row['path']}` | {row['skipped']} |\n")
 
-        with open(report_dir / 'folder_structure.md', 'w', encoding='utf-8') as f:
+        sections['folder_structure'] = ReportWriter(report_dir / 'folder_structure.md', signature)
+        with sections['folder_structure'] as f:
             f.write(f"# {labels['folder_structure_title']}\n\n")
+            approximate = meta.get('approximate_error')
+            if approximate:
+                f.write(f"*{labels['approximate_note'].format(error=float(approximate) * 100)}*\n")
             f.write("\n")
-            f.write("\n".join(print_tree(tree)))
-            f.write("\n")
-            f.write(signature)
+            for line in print_tree(load_tree(conn), approximate=bool(approximate)):
+                f.write(line + "\n")
 
-        with open(report_dir / 'timeline.md', 'w', encoding='utf-8') as f:
+        sections['timeline'] = ReportWriter(report_dir / 'timeline.md', signature)
+        with sections['timeline'] as f:
             f.write(f"# {labels['timeline_title']}\n\n")
             f.write(f"| {labels['timeline_headers'][0]} | {labels['timeline_headers'][1]} | {labels['timeline_headers'][2]} | {labels['timeline_headers'][3]} |\n")
             f.write("|---------------------|-----------------|--------------------------|-----------------|\n")
-            for commit in commits:
-                date = commit.committed_datetime.strftime("%Y-%m-%d %H:%M:%S")
-                author = commit.author.name
-                message = commit.message.strip().replace('\n', ' ')
-                stats = commit.stats.total
-                changes = f"+{stats['insertions']}, -{stats['deletions']}"
-                f.write(f"| {date} | {author} | {message[:50]}{'...' if len(message) > 50 else ''} | {changes} |\n")
-            f.write(signature)
-
-        with open(report_dir / 'contributors.md', 'w', encoding='utf-8') as f:
+            index.add_section('timeline.md', 0, f.tell())
+            for commit in conn.execute("SELECT date, author, message, insertions, deletions FROM commits ORDER BY seq"):
+                message = commit['message']
+                changes = f"+{commit['insertions']}, -{commit['deletions']}"
+                start = f.tell()
+                f.write(f"| {commit['date']} | {commit['author']} | {message[:50]}{'...' if len(message) > 50 else ''} | {changes} |\n")
+                index.add_row('timeline.md', start, f.tell(), commit['author'], commit['date'])
+
+        sections['contributors'] = ReportWriter(report_dir / 'contributors.md', signature)
+        with sections['contributors'] as f:
             f.write(f"# {labels['contributors_title']}\n\n")
             f.write(f"| {labels['contributors_headers'][0]} | {labels['contributors_headers'][1]} | {labels['contributors_headers'][2]} | {labels['contributors_headers'][3]} |\n")
             f.write("|-------------------|-------------------|-------------------|-------------------|\n")
-            for author, data in sorted(contributor_data.items()):
+            for author in conn.execute("SELECT name, commit_count, lines_added, lines_removed FROM authors ORDER BY name"):
                 github_link = "Not Available"
-                total_lines_contrib = data['lines_added'] - data['lines_removed']
-                f.write(f"| {author} | {github_link} | {total_lines_contrib} | {len(data['commits'])} |\n")
+                total_lines_contrib = author['lines_added'] - author['lines_removed']
+                f.write(f"| {author['name']} | {github_link} | {total_lines_contrib} | {author['commit_count']} |\n")
             f.write("\n## Contributor Timelines\n\n")
-            for author, data in sorted(contributor_data.items()):
+            index.add_section('contributors.md', 0, f.tell())
+            author_commits = conn.execute("SELECT author, date, message, insertions, deletions FROM commits ORDER BY author, date, seq")
+            for author, commits in itertools.groupby(author_commits, key=lambda commit: commit['author']):
+                start = f.tell()
                 f.write(f"### {author}\n\n")
                 f.write(f"| {labels['timeline_headers'][0]} | {labels['timeline_headers'][2]} | {labels['timeline_headers'][3]} |\n")
                 f.write("|---------------------|--------------------------|-----------------|\n")
-                for commit in sorted(data['commits'], key=lambda x: x['date']):
-                    f.write(f"| {commit['date']} | {commit['message'][:50]}{'...' if len(commit['message']) > 50 else ''} | +{commit['lines_added']}, -{commit['lines_removed']} |\n")
+                index.add_section('contributors.md', start, f.tell(), author)
+                for commit in commits:
+                    start = f.tell()
+                    f.write(f"| {commit['date']} | {commit['message'][:50]}{'...' if len(commit['message']) > 50 else ''} | +{commit['insertions']}, -{commit['deletions']} |\n")
+                    index.add_row('contributors.md', start, f.tell(), author, commit['date'])
                 f.write("\n")
-            f.write(signature)
+
+        if meta.get('ownership'):
+            sections['ownership'] = ReportWriter(report_dir / 'ownership.md', signature)
+            with sections['ownership'] as f:
+                file_owners, folder_owners = load_ownership(conn)
+                repo_owners = folder_owners.get('', {})
+                repo_total = sum(repo_owners.values())
+                f.write(f"# {labels['ownership_title']}\n\n")
+                f.write(f"| {labels['ownership_headers'][0]} | {labels['ownership_headers'][1]} | {labels['ownership_headers'][2]} |\n")
+                f.write("|-------------------|-------------------|-------------------|\n")
+                for name, lines in sorted(repo_owners.items(), key=lambda owner: (-owner[1], owner[0])):
+                    f.write(f"| {name} | {lines} | {lines / repo_total * 100:.2f}% |\n")
+                for title, owners, suffix in ((labels['ownership_folders_title'], folder_owners, '/'),
+                                              (labels['ownership_files_title'], file_owners, '')):
+                    f.write(f"\n## {title}\n\n")
+                    f.write(f"| {labels['ownership_path_headers'][0]} | {labels['ownership_path_headers'][1]} | {labels['ownership_path_headers'][2]} |\n")
+                    f.write("|-------------------|-------------------|-------------------|\n")
+                    for path in sorted(owners):
+                        if path:
+                            f.write(f"| `{path}{suffix}` | {sum(owners[path].values())} | {format_owners(owners[path])} |\n")
+
+        index.finish(['timeline.md', 'contributors.md'])
 
         with open(report_dir / 'full_report.md', 'w', encoding='utf-8') as f:
             f.write(f"# {labels['full_report_title']}\n\n")
             f.write("![Q-Git Badge](https://img.shields.io/badge/Q--Git-Analyzed-blue?style=flat-square)\n\n")
             f.write(f"## {labels['repo_info_title']}\n\n")
-            with open(report_dir / 'repo_info.md', 'r', encoding='utf-8') as repo_file:
-                f.write(repo_file.read().split("---")[0])
+            sections['repo_info'].copy_body(f)
             f.write(f"\n## {labels['folder_structure_title']}\n\n")
-            with open(report_dir / 'folder_structure.md', 'r', encoding='utf-8') as folder_file:
-                f.write(folder_file.read().split("---")[0])
+            sections['folder_structure'].copy_body(f)
             f.write(f"\n## {labels['timeline_title']}\n\n")
-            with open(report_dir / 'timeline.md', 'r', encoding='utf-8') as timeline_file:
-                f.write(timeline_file.read().split("---")[0])
+            sections['timeline'].copy_body(f)
             f.write(f"\n## {labels['contributors_title']}\n\n")
-            with open(report_dir / 'contributors.md', 'r', encoding='utf-8') as contrib_file:
-                f.write(contrib_file.read().split("---")[0])
+            sections['contributors'].copy_body(f)
+            if 'ownership' in sections:
+                f.write(f"\n## {labels['ownership_title']}\n\n")
+                sections['ownership'].copy_body(f)
             f.write(signature)
+    finally:
+        for section in sections.values():
+            section.close()
+        index.close()
+        conn.close()
+
+def analyze_repo(repo_url, lang="EN", clone_mode="checkout", cache_dir=None, incremental=True, workers=1,
+                 since=None, until=None, max_commits=None, approximate=None, ownership=False, force_clone=False,
+                 reports_dir='reports', blob_cache=None, progress_callback=None):
+    """Analyzes the GitHub repository and generates Markdown reports.
+
+    clone_mode "bare" skips the checkout and reads file contents through
+    `git cat-file --batch`; "blobless" also makes a partial clone and only
+    downloads the blobs the analysis reads.
+
+    With a cache_dir (default: $QGIT_CACHE_DIR) the repository is kept as a
+    bare mirror between runs and only new objects are fetched. Line counts
+    are kept by blob SHA in a cache shared by every analysis, so only blobs
+    no analysis counted before are read (or, in blobless mode, downloaded).
+
+    A local checkout or bare repository (a path or file:// URL) is analyzed
+    in place and read-only: nothing is cloned, and files are read from the
+    HEAD commit, like in bare mode, so uncommitted changes are ignored.
+    With `force_clone` it is cloned like a remote repository instead, so
+    clone modes can be compared on it (the benchmark does this).
+
+    Everything computed is saved to an SQLite artifact (analysis.sqlite)
+    next to the reports, and the reports are rendered from it. The state
+    needed to continue is saved with the HEAD it was computed at; with
+    `incremental` a later run only reads the commits since then, unless
+    history was rewritten.
+
+    With more than one worker, history diffs and commit stats are computed
+    on a process pool; the reports are the same as with one.
+
+    since, until (any date git understands) and max_commits limit the
+    timeline, contributors and per-file commit counts to a window of
+    history; line counts still describe HEAD. A fresh clone then only
+    fetches that window (--shallow-since, or --depth for max_commits).
+
+    With `approximate` (a standard error such as 0.02) folder commit counts
+    are estimated from fixed-size sketches instead of exact commit sets,
+    which bounds the memory of the folder tree; the report says so.
+
+    With `ownership` every file is blamed (git blame, on a thread pool) and
+    ownership.md lists the surviving lines per author of every file and
+    folder. Blame is saved with the blob SHA of each file, so a later run
+    only blames files whose contents changed.
+
+    Reports go to <reports_dir>/<repo name>/; `blob_cache` is the path of
+    the shared blob cache (default: next to the mirror cache, see
+    blob_cache.default_cache_path).
+
+    Progress is reported as ProgressEvents to progress_callback (default: a
+    bar on stdout), including per-file and per-commit counts in long stages.
+    The time, memory and git processes of every stage are saved to
+    run_summary.json, whatever the outcome.
+    """
+    progress = ProgressReporter(11 if ownership else 10, progress_callback)
+    progress.stage('start', "📋 Starting repository analysis")
+    local_source = local_repo_path(repo_url)
+    local_path = None if force_clone else local_source
+    # Local repositories are read in place; only clones get a temporary directory.
+    temp_dir = None if local_path else tempfile.mkdtemp()
+    repo_name = get_repo_name(repo_url)
+    report_dir = Path(reports_dir) / repo_name
+    report_dir.mkdir(parents=True, exist_ok=True)
+    repo = None
+    artifact = None
+    mirror_lock = None
 
-        print_progress(total_steps, total_steps, "✅ Analysis complete! Reports in: " + str(report_dir), spinner)
-        print()
+    try:
+        progress.stage('validate', "🔗 Validating repository URL")
+        if not (repo_url.startswith(REMOTE_URL_PREFIXES) or local_source):
+            raise ValueError("Invalid repository URL. Use HTTPS (https://github.com/...) or SSH (git@github.com:...) format, a file:// URL or a local path.")
+        clone_url = repo_url + '.git' if repo_url.startswith('https://') and not repo_url.endswith('.git') else repo_url
+        if local_source:
+            # Plain paths are cloned with hard links, which ignore the blobless filter; file:// URLs are not.
+            clone_url = local_source.as_uri()
+        if clone_mode not in CLONE_MODES:
+            raise ValueError(f"Invalid clone mode. Use one of: {', '.join(CLONE_MODES)}.")
+        if max_commits is not None and max_commits < 1:
+            raise ValueError("The commit limit must be a positive number.")
+        if approximate is not None:
+            # Raises for an error bound outside (0, 1) before any clone or history work.
+            precision_for_error(approximate)
+
+        if local_path:
+            progress.stage('clone', "📂 Opening local repository in place")
+            repo = git.Repo(local_path)
+        else:
+            progress.stage('clone', "📥 Cloning repository")
+            cache_dir = cache_dir or default_cache_dir()
+            if cache_dir:
+                mirror, mirror_lock = update_mirror(clone_url, cache_dir)
+                git.Repo.clone_from(str(mirror), temp_dir, shared=True, bare=clone_mode != "checkout")
+            else:
+                git.Repo.clone_from(clone_url, temp_dir, **clone_options(clone_mode), **shallow_options(since, max_commits))
+            repo = git.Repo(temp_dir)
+            if since and not cache_dir and not deepen_shallow_clone(repo):
+                # The shallow clone lacks commits of the window; clone the whole history instead.
+                repo.close()
+                safe_rmtree(temp_dir)
+                git.Repo.clone_from(clone_url, temp_dir, **clone_options(clone_mode))
+                repo = git.Repo(temp_dir)
+        read_worktree = clone_mode == "checkout" and not local_path
+        # A shallow clone resolved `since` a little earlier, so it holds all of this window.
+        since_at, until_at = pin_date(repo, since), pin_date(repo, until)
+        limits = window_args(since_at, until_at, max_commits)
+        # Saved pinned, so a relative window ("2 weeks ago") that moved since the last run is not mistaken for it.
+        window = {'since': since_at, 'until': until_at, 'max_commits': max_commits} if since or until or max_commits else None
+
+        progress.stage('files', "📄 Collecting tracked files")
+        tree_entries = list_tree(repo)
+        blobs = {path: sha for path, _, obj_type, sha, _ in tree_entries if obj_type == 'blob'}
+        # Line counts of blobs any analysis has seen before, here or in another repository (a fork, say).
+        blob_cache = blob_cache or default_cache_path(cache_dir or default_cache_dir())
+        known_blobs = lookup_blobs(set(blobs.values()), blob_cache)
+        if read_worktree:
+            tracked_files = [f for f in repo.git.ls_files('-z').split('\0') if f]
+        else:
+            tracked_files = [entry[0] for entry in tree_entries]
+            if clone_mode == "blobless" and not local_path:
+                prefetch_missing_blobs(repo, [sha for _, _, obj_type, sha, size in tree_entries
+                                              if obj_type == 'blob' and size <= MAX_FILE_BYTES and sha not in known_blobs])
+
+        def count_file_lines(file_paths):
+            on_progress = progress.items('files')
+            if read_worktree:
+                return count_worktree_lines(repo, file_paths, on_progress=on_progress, blobs=blobs, known=known_blobs)
+            return count_tree_lines(repo, file_paths, tree_entries, on_progress=on_progress, known=known_blobs)
+
+        progress.stage('analyze', "📊 Analyzing files and commits")
+        state = load_state(report_dir) if incremental else empty_state()
+        base = resume_point(repo, state, window, limits)
+        if base is None:
+            state = empty_state()
+        state['window'] = window
+        file_data = update_files(repo, state, base, tracked_files, count_file_lines, workers, progress.items('commits'), limits)
+        store_blobs(known_blobs, blob_cache)
+
+        progress.stage('tree', "🌳 Building folder structure")
+        tree = build_tree_structure(file_data, approximate)
+        aggregate_tree(tree)
+
+        progress.stage('history', "⏳ Fetching commit history")
+        artifact = AnalysisArtifact(report_dir)
+        update_commits(repo, state, base, artifact, workers, progress.items('commits'), limits)
+
+        if ownership:
+            progress.stage('ownership', "👥 Blaming files for code ownership")
+            text_blobs = {path: sha for path, sha in blobs.items() if file_data[path]['lines']}
+            blame = update_ownership(repo, state, base, text_blobs, since_at, clone_mode == "blobless" and not local_path,
+                                     progress.items('files'))
+            artifact.add_blame((path, sha, lines) for path, commits in blame.items() for sha, lines in commits.items())
+
+        progress.stage('languages', "🔍 Analyzing languages and frameworks")
+        file_languages, frameworks = classify_tree(repo, tree_entries, clone_mode == "blobless" and not local_path)
+        languages, total_lines = detect_languages(file_data, file_languages, state['skipped'])
+
+        progress.stage('reports', "📝 Generating reports")
+        artifact.add_files((file_path, data['lines'], len(data['commits']), file_languages.get(file_path, 'Unknown'), state['skipped'].get(file_path))
+                           for file_path, data in file_data.items())
+        artifact.add_folders((folder_path, node.lines, node.commit_count) for folder_path, node in iter_folders(tree))
+        artifact.add_languages(languages)
+        artifact.add_frameworks(frameworks)
+        artifact.set_meta(repo_url=str(local_source) if local_source else repo_url, repo_name=repo_name, head=state['head'],
+                          since=since, until=until, max_commits=max_commits,
+                          approximate_error=tree.commits.standard_error if approximate else None,
+                          ownership=1 if ownership else None)
+        artifact.finish()
+        save_state(report_dir, state)
+        render_reports(report_dir, lang)
+        record_report(report_dir)
+
+        progress.complete("✅ Analysis complete! Reports in: " + str(report_dir))
 
     except Exception as e:
-        print(f"\n❌ Error: {str(e)}", file=sys.stderr)
+        progress.fail(e)
         raise
     finally:
-        print_progress(total_steps, total_steps, "🧹 Cleaning up temporary files", spinner)
-        print()
-        safe_rmtree(temp_dir)
-
-def analyze_git_user(username, lang="EN"):
+        progress.cleanup("🧹 Cleaning up temporary files")
+        if artifact:
+            artifact.close()
+        if repo:
+            repo.close()
+        if temp_dir:
+            safe_rmtree(temp_dir)
+        if mirror_lock:
+            # The shared clone is gone, so the mirror may be evicted again.
+            mirror_lock.close()
+        save_run_summary(report_dir, progress.finish())
+
+def analyze_git_user(username, lang="EN", progress_callback=None):
     """Analyzes a GitHub user's contributions and projects (mock implementation)."""
-    total_steps = 10
-    step = 0
-    spinner = itertools.cycle(['|', '/', '-', '\\'])
-    print_progress(step, total_steps, "📋 Starting GitHub user analysis", spinner)
-    step += 1
+    progress = ProgressReporter(10, progress_callback)
+    progress.stage('start', "📋 Starting GitHub user analysis")
 
     if not username or not username.strip():
         raise ValueError("GitHub username cannot be empty.")
@@ -445,21 +775,18 @@ def analyze_git_user(username, lang="EN"):
     report_dir.mkdir(parents=True, exist_ok=True)
 
     # Mock data (replace with GitHub API calls in production)
-    print_progress(step, total_steps, "🔍 Fetching contributed projects", spinner)
-    step += 1
+    progress.stage('contributed', "🔍 Fetching contributed projects")
     contrib_projects = [
         {"name": "repo1", "lines": 500, "commits": 10, "languages": {"Python": 400, "JavaScript": 100}, "frameworks": {"Node.js": "package.json"}, "commit_dates": ["2023-01-01", "2023-01-02"]},
         {"name": "repo2", "lines": 300, "commits": 5, "languages": {"Java": 300}, "frameworks": {"Maven": "pom.xml"}, "commit_dates": ["2023-02-01"]}
     ]
 
-    print_progress(step, total_steps, "🔍 Fetching user projects", spinner)
-    step += 1
+    progress.stage('projects', "🔍 Fetching user projects")
     user_projects = [
         {"name": "myrepo", "lines": 1000, "commits": 20, "languages": {"Python": 1000}, "frameworks": {"Python (Pip)": "requirements.txt"}, "commit_dates": ["2023-03-01", "2023-03-02"]}
     ]
 
-    print_progress(step, total_steps, "📊 Summarizing contributions", spinner)
-    step += 1
+    progress.stage('contributions', "📊 Summarizing contributions")
     contrib_lines = sum(p["lines"] for p in contrib_projects)
     contrib_commits = sum(p["commits"] for p in contrib_projects)
     contrib_langs = defaultdict(int)
@@ -469,8 +796,7 @@ def analyze_git_user(username, lang="EN"):
             contrib_langs[lang] += lines
         contrib_frameworks.update(p["frameworks"])
 
-    print_progress(step, total_steps, "📊 Summarizing user projects", spinner)
-    step += 1
+    progress.stage('summary', "📊 Summarizing user projects")
     user_lines = sum(p["lines"] for p in user_projects)
     user_commits = sum(p["commits"] for p in user_projects)
     user_langs = defaultdict(int)
@@ -480,16 +806,14 @@ def analyze_git_user(username, lang="EN"):
             user_langs[lang] += lines
         user_frameworks.update(p["frameworks"])
 
-    print_progress(step, total_steps, "📈 Calculating activity heatmap", spinner)
-    step += 1
+    progress.stage('activity', "📈 Calculating activity heatmap")
     all_dates = [d for p in contrib_projects + user_projects for d in p["commit_dates"]]
     heatmap = defaultdict(int)
     for date in all_dates:
         month = date[:7]  # YYYY-MM
         heatmap[month] += 1
 
-    print_progress(step, total_steps, "⏳ Generating timeline", spinner)
-    step += 1
+    progress.stage('timeline', "⏳ Generating timeline")
     timeline = [
         {"date": "2023-01-01", "action": "Contributed to repo1", "changes": "+500, -0"},
         {"date": "2023-02-01", "action": "Contributed to repo2", "changes": "+300, -0"},
@@ -498,8 +822,7 @@ def analyze_git_user(username, lang="EN"):
 
     signature = f"\n---\nGenerated with [Q-Git](https://github.com/QLineTech/Q-Git) on {time.strftime('%Y-%m-%d %H:%M:%S')}"
 
-    print_progress(step, total_steps, "📝 Generating user reports", spinner)
-    step += 1
+    progress.stage('reports', "📝 Generating user reports")
     with open(report_dir / 'contributed_summary.md', 'w', encoding='utf-8') as f:
         f.write(f"# {labels['user_contrib_title']}\n\n")
         f.write(f"- **Total Lines of Code**: {contrib_lines}\n")
@@ -546,8 +869,9 @@ def analyze_git_user(username, lang="EN"):
             f.write(f"| {month} | {count} |\n")
         f.write(signature)
 
-    print_progress(total_steps, total_steps, "✅ User analysis complete! Reports in: " + str(report_dir), spinner)
-    print()
+    record_report(report_dir)
+    progress.complete("✅ User analysis complete! Reports in: " + str(report_dir))
+    save_run_summary(report_dir, progress.finish())
 
 def show_menu(current_lang):
     """Displays the selection menu and returns the user's choice."""
@@ -559,7 +883,63 @@ def show_menu(current_lang):
     choice = input("Select an option (1-4): ").strip()
     return choice
 
+def parse_args(argv=None):
+    """Parses command-line options; without --repo or --user the interactive menu runs."""
+    parser = argparse.ArgumentParser(description="Q-Git Advanced Git Analyzer")
+    parser.add_argument('--repo', help="analyze this repository URL or local path and exit")
+    parser.add_argument('--user', help="analyze this GitHub user and exit")
+    parser.add_argument('--lang', type=str.upper, choices=SUPPORTED_LANGS, default="EN", help="report language")
+    parser.add_argument('--clone-mode', choices=CLONE_MODES, default="checkout", help="how the repository is cloned")
+    parser.add_argument('--workers', type=int, default=1, help="processes used for history analysis")
+    parser.add_argument('--since', metavar='DATE', help="only analyze history since DATE (e.g. 2024-01-01 or '3 months ago')")
+    parser.add_argument('--until', metavar='DATE', help="only analyze history until DATE")
+    parser.add_argument('--max-commits', type=int, metavar='N', help="only analyze the N most recent commits")
+    parser.add_argument('--approximate', type=float, nargs='?', const=0.02, metavar='ERROR',
+                        help="estimate folder commit counts with sketches of this standard error (default: 0.02)")
+    parser.add_argument('--ownership', action='store_true', help="blame every file to report the surviving lines per author")
+    parser.add_argument('--render', metavar='DIR', help="render the reports in DIR (e.g. reports/Q-Git) again from its saved analysis and exit")
+    parser.add_argument('--batch', metavar='FILE', help="analyze every repository listed in FILE and exit")
+    parser.add_argument('--concurrency', type=int, default=4, help="repositories analyzed at once in batch mode")
+    parser.add_argument('--timeout', type=float, help="seconds allowed per repository in batch mode")
+    parser.add_argument('--profile', metavar='FILE', help="save a cProfile dump of the --repo/--user analysis to FILE")
+    args = parser.parse_args(argv)
+    if args.approximate is not None and not 0 < args.approximate < 1:
+        parser.error("--approximate must be between 0 and 1, e.g. 0.02 for 2%")
+    return args
+
 if __name__ == "__main__":
+    args = parse_args()
+    # Turn SIGTERM (batch timeouts) into SystemExit so temporary clones are still removed.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    if args.batch:
+        from batch import read_repo_list, run_batch
+        window = {'since': args.since, 'until': args.until, 'max_commits': args.max_commits}
+        results = run_batch(read_repo_list(args.batch), args.concurrency, args.timeout, args.lang, args.clone_mode, args.workers,
+                            window, args.approximate, args.ownership)
+        sys.exit(0 if all(result['status'] == 'success' for result in results) else 1)
+    if args.render:
+        render_reports(Path(args.render), args.lang)
+        record_report(Path(args.render))
+        print(f"✅ Reports rendered in: {args.render}")
+        sys.exit(0)
+    if args.repo or args.user:
+        profiler = cProfile.Profile() if args.profile else None
+        if profiler:
+            profiler.enable()
+        try:
+            if args.repo:
+                analyze_repo(args.repo, args.lang, args.clone_mode, workers=args.workers,
+                             since=args.since, until=args.until, max_commits=args.max_commits, approximate=args.approximate,
+                             ownership=args.ownership)
+            if args.user:
+                analyze_git_user(args.user, args.lang)
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(args.profile)
+                print(f"📈 Profile saved to: {args.profile} (view with: python -m pstats {args.profile})")
+        sys.exit(0)
+
     os.system('cls' if os.name == 'nt' else 'clear')
     ascii_art = (
         "┌──────────────────────────────────────────┐\n"
@@ -575,8 +955,8 @@ if __name__ == "__main__":
     )
     print(ascii_art)
 
-    lang = "EN"
-    supported_langs = ["EN", "TR", "IT", "FR", "ES", "DE"]
+    lang = args.lang
+    supported_langs = SUPPORTED_LANGS
 
     while True:
         choice = show_menu(lang)
@@ -588,9 +968,14 @@ if __name__ == "__main__":
             print(f"Selected language: {lang}")
 
         elif choice == "2":
-            repo_url = input("Enter the GitHub repo URL: ").strip()
+            repo_url = input("Enter the GitHub repo URL or local path: ").strip()
             if repo_url:
-                analyze_repo(repo_url, lang)
+                clone_mode = input(f"Choose clone mode ({', '.join(CLONE_MODES)}, default: checkout): ").strip().lower()
+                if clone_mode not in CLONE_MODES:
+                    clone_mode = "checkout"
+                analyze_repo(repo_url, lang, clone_mode, workers=args.workers,
+                             since=args.since, until=args.until, max_commits=args.max_commits, approximate=args.approximate,
+                             ownership=args.ownership)
             else:
                 print("❌ Repository URL cannot be empty.")
 
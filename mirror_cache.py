@@ -0,0 +1,221 @@
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import git
+
+from file_utils import safe_rmtree
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_MAX_SIZE_MB = 20 * 1024
+LAST_USED_MARKER = 'q-git-last-used'
+FETCH_REFSPECS = ['+refs/heads/*:refs/heads/*', '+refs/tags/*:refs/tags/*']
+
+_locks = defaultdict(threading.Lock)
+_locks_lock = threading.Lock()
+
+
+def default_cache_dir():
+    """Returns the mirror cache directory from QGIT_CACHE_DIR, or None when caching is off."""
+    cache_dir = os.environ.get('QGIT_CACHE_DIR')
+    return Path(cache_dir).expanduser() if cache_dir else None
+
+
+def default_max_bytes():
+    """Returns the cache size limit from QGIT_CACHE_SIZE_MB."""
+    return int(os.environ.get('QGIT_CACHE_SIZE_MB', DEFAULT_MAX_SIZE_MB)) * 1024 * 1024
+
+
+def normalize_repo_url(repo_url):
+    """Reduces HTTPS and SSH forms of a repository URL to 'host/owner/name'."""
+    url = repo_url.strip()
+    match = re.match(r'^[\w.-]+@([^:/]+):(.+)$', url)
+    if match:
+        host, path = match.groups()
+    else:
+        url = re.sub(r'^[a-z+]+://', '', url)
+        url = re.sub(r'^[^@/]+@', '', url)
+        host, _, path = url.partition('/')
+    host = host.split(':')[0] or 'local'
+    if path.endswith('.git'):
+        path = path[:-4]
+    parts = [part for part in path.split('/') if part not in ('', '.', '..')]
+    return '/'.join([host, *parts]).lower()
+
+
+def mirror_path(cache_dir, repo_url):
+    """Returns where the bare mirror of a repository lives inside the cache."""
+    return Path(cache_dir) / f"{normalize_repo_url(repo_url)}.git"
+
+
+def list_mirrors(cache_dir):
+    """Lists every mirror in the cache."""
+    cache_dir = Path(cache_dir)
+    if not cache_dir.exists():
+        return []
+    return [marker.parent for marker in cache_dir.glob(f'**/*.git/{LAST_USED_MARKER}')]
+
+
+def find_fork_sources(cache_dir, repo_url):
+    """Finds cached mirrors on the same host with the same repository name, most recently used first."""
+    host, _, path = normalize_repo_url(repo_url).partition('/')
+    name = path.rsplit('/', 1)[-1]
+    target = mirror_path(cache_dir, repo_url)
+    candidates = [m for m in (Path(cache_dir) / host).glob(f'**/{name}.git') if m != target and (m / LAST_USED_MARKER).exists()]
+    return sorted(candidates, key=last_used, reverse=True)
+
+
+def last_used(mirror):
+    """Returns when a mirror was last used for an analysis."""
+    return (mirror / LAST_USED_MARKER).stat().st_mtime
+
+
+def touch(mirror):
+    """Marks a mirror as just used."""
+    (mirror / LAST_USED_MARKER).write_text(time.strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def directory_size(path):
+    """Sums the sizes of all files below a directory."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def borrowers(cache_dir, mirror):
+    """Lists mirrors that read objects from `mirror` through git alternates."""
+    objects_dir = (mirror / 'objects').resolve()
+    result = []
+    for other in list_mirrors(cache_dir):
+        alternates = other / 'objects' / 'info' / 'alternates'
+        if other != mirror and alternates.exists():
+            if objects_dir in (Path(line.strip()).resolve() for line in alternates.read_text().splitlines() if line.strip()):
+                result.append(other)
+    return result
+
+
+def dissociate(mirror):
+    """Copies borrowed objects into a mirror so it no longer depends on its alternates."""
+    git.Repo(mirror).git.repack('-a', '-d', '-q')
+    (mirror / 'objects' / 'info' / 'alternates').unlink()
+
+
+def thread_lock(mirror):
+    """Returns the lock that serializes updates of a mirror between the threads of this process."""
+    with _locks_lock:
+        return _locks[str(mirror)]
+
+
+def lock_mirror(mirror, kind='use', exclusive=False, blocking=True):
+    """Locks a mirror for every process sharing the cache; closing the returned file releases it.
+
+    The 'use' lock is held shared by every analysis cloning from the mirror
+    (or borrowing its objects) until it is done, and exclusively by evict()
+    while it removes the mirror. The 'update' lock is held exclusively while
+    the mirror is created or fetched. Returns None when `blocking` is False
+    and the lock is taken. Without fcntl (Windows) only threads are kept apart.
+    """
+    path = mirror.with_name(f"{mirror.name}.{kind}.lock")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock = open(path, 'a')
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            lock.close()
+            return None
+    return lock
+
+
+def evict(cache_dir, max_bytes, keep=()):
+    """Removes least recently used mirrors until the cache fits in max_bytes.
+
+    Mirrors an analysis is still using are skipped.
+    """
+    mirrors = sorted(list_mirrors(cache_dir), key=last_used)
+    sizes = {mirror: directory_size(mirror) for mirror in mirrors}
+    total = sum(sizes.values())
+    evicted = []
+    for mirror in mirrors:
+        if total <= max_bytes:
+            break
+        if mirror in keep:
+            continue
+        in_use = lock_mirror(mirror, exclusive=True, blocking=False)
+        if in_use is None:
+            continue
+        try:
+            for other in borrowers(cache_dir, mirror):
+                with lock_mirror(other, 'update', exclusive=True):
+                    dissociate(other)
+                total -= sizes.get(other, 0)
+                sizes[other] = directory_size(other)
+                total += sizes[other]
+            safe_rmtree(mirror)
+        finally:
+            in_use.close()
+        total -= sizes[mirror]
+        evicted.append(mirror)
+    return evicted
+
+
+def update_mirror(clone_url, cache_dir, max_bytes=None):
+    """Creates or incrementally fetches the cached bare mirror of a repository.
+
+    A new mirror borrows objects from a cached fork of the same repository
+    through git alternates, so only the objects the fork lacks are downloaded.
+    Returns the mirror's path and its 'use' lock (see lock_mirror), held
+    shared; close it once clones of the mirror are no longer read, so the
+    mirror is not evicted from under them.
+    """
+    mirror = mirror_path(cache_dir, clone_url)
+    in_use = lock_mirror(mirror)
+    try:
+        with thread_lock(mirror), lock_mirror(mirror, 'update', exclusive=True):
+            if (mirror / LAST_USED_MARKER).exists():
+                git.Repo(mirror).git.fetch('origin', '--prune', '--quiet')
+            else:
+                create_mirror(clone_url, cache_dir, mirror)
+            touch(mirror)
+        evict(cache_dir, max_bytes if max_bytes is not None else default_max_bytes(), keep=(mirror,))
+    except BaseException:
+        in_use.close()
+        raise
+    return mirror, in_use
+
+
+def create_mirror(clone_url, cache_dir, mirror):
+    """Clones a new mirror, borrowing objects from the most recently used cached fork if there is one."""
+    mirror.parent.mkdir(parents=True, exist_ok=True)
+    options = {'bare': True}
+    source = None
+    for candidate in find_fork_sources(cache_dir, clone_url):
+        # The fork must not be evicted while the clone reads from it.
+        source = lock_mirror(candidate)
+        if (candidate / LAST_USED_MARKER).exists():
+            options['reference_if_able'] = str(candidate)
+            break
+        source.close()
+        source = None
+    try:
+        repo = git.Repo.clone_from(clone_url, mirror, **options)
+    finally:
+        if source:
+            source.close()
+    with repo.config_writer() as config:
+        config.set_value('remote "origin"', 'fetch', FETCH_REFSPECS[0])
+        config.add_value('remote "origin"', 'fetch', FETCH_REFSPECS[1])
+        # Borrowed objects must never be pruned away from under a fork.
+        config.set_value('gc', 'auto', '0')
@@ -0,0 +1,48 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# First line of every blamed range: <commit> <line in commit> <line in file> <number of lines>
+BLAME_HEADER = re.compile(rb'^([0-9a-f]{40,64}) \d+ \d+ (\d+)$', re.MULTILINE)
+
+
+def parse_blame(output):
+    """Returns {commit sha: lines} from `git blame --incremental` output."""
+    lines = {}
+    for sha, count in BLAME_HEADER.findall(output):
+        sha = sha.decode('ascii')
+        lines[sha] = lines.get(sha, 0) + int(count)
+    return lines
+
+
+def blame_file(repo, path, rev='HEAD', since=None):
+    """Returns the commits that last changed each line of a file at `rev`, as {commit sha: lines}.
+
+    With `since` blame stops at that date and gives older lines to the
+    commits just before it.
+    """
+    args = ['--incremental', *([f'--since={since}'] if since else []), rev, '--', path]
+    return parse_blame(repo.git.blame(*args, stdout_as_string=False))
+
+
+def blame_files(repo, paths, since=None, workers=None, on_progress=None):
+    """Blames many files on a thread pool; returns {path: {commit sha: lines}}.
+
+    Blame runs in one git process per file, so threads keep every core
+    busy. `workers` defaults to the number of CPUs; `on_progress(done,
+    total)` is called as files are blamed.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [executor.submit(blame_file, repo, path, since=since) for path in paths]
+        try:
+            for done, (path, future) in enumerate(zip(paths, futures), 1):
+                results[path] = future.result()
+                if on_progress:
+                    on_progress(done, len(paths))
+        except BaseException:
+            # Don't blame the remaining files when the analysis is stopped.
+            for future in futures:
+                future.cancel()
+            raise
+    return results
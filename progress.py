@@ -0,0 +1,122 @@
+import itertools
+import sys
+import time
+from collections import namedtuple
+
+from instrumentation import StageMeter
+
+# Seconds between item events of one stage; stage changes are always sent.
+ITEM_EVENT_INTERVAL = 0.1
+
+
+class ProgressEvent(namedtuple('ProgressEvent', ['stage', 'message', 'step', 'total_steps', 'done', 'total', 'unit', 'elapsed', 'status', 'summary'],
+                               defaults=(None,))):
+    """One progress update of an analysis.
+
+    `step` of `total_steps` stages are finished; `done` of `total` items of
+    the current stage are (`total` is None while it is not known yet).
+    `status` is 'running', 'complete' or 'error'. The last event, stage
+    'finished', carries the run summary with the measurements of every stage.
+    """
+    __slots__ = ()
+
+    @property
+    def percentage(self):
+        if self.status != 'running':
+            return 100.0
+        fraction = self.done / self.total if self.done is not None and self.total else 0
+        return min(100.0, (self.step + fraction) / self.total_steps * 100)
+
+    def to_dict(self):
+        return dict(self._asdict(), percentage=round(self.percentage, 1), elapsed=round(self.elapsed, 2))
+
+
+class ProgressBar:
+    """Renders progress events as a one-line bar with a spinner, like the CLI always did."""
+
+    def __init__(self, bar_length=20):
+        self.bar_length = bar_length
+        self.spinner = itertools.cycle(['|', '/', '-', '\\'])
+        self.line_length = 0
+
+    def __call__(self, event):
+        if event.stage == 'error':
+            print(f"\n❌ Error: {event.message}", file=sys.stderr)
+            return
+        if event.stage == 'finished':
+            print(event.message)
+            return
+        percentage = event.percentage
+        filled = int(self.bar_length * percentage // 100)
+        bar = '█' * filled + ' ' * (self.bar_length - filled)
+        items = ''
+        if event.done is not None:
+            items = f" ({event.done}/{event.total} {event.unit})" if event.total else f" ({event.done} {event.unit})"
+        line = f"{event.message} {next(self.spinner)} [{bar}] {percentage:.1f}%{items}"
+        # Pad over the rest of a longer previous line.
+        sys.stdout.write(f"\r{line.ljust(self.line_length)}")
+        sys.stdout.flush()
+        self.line_length = len(line)
+        if event.stage in ('complete', 'cleanup'):
+            print()
+            self.line_length = 0
+
+
+class ProgressReporter:
+    """Sends the progress events of one analysis to a callback (default: a ProgressBar).
+
+    Every stage is also measured by a StageMeter; finish() reports the totals.
+    """
+
+    def __init__(self, total_steps, callback=None):
+        self.total_steps = total_steps
+        self.callback = callback or ProgressBar()
+        self.meter = StageMeter()
+        self.start = time.monotonic()
+        self.step = 0
+        self.stage_name = None
+        self.message = ''
+        self.status = 'running'
+        self.last_item_event = 0
+
+    def emit(self, stage, message, step, done=None, total=None, unit=None, summary=None):
+        self.callback(ProgressEvent(stage, message, step, self.total_steps, done, total, unit,
+                                    time.monotonic() - self.start, self.status, summary))
+
+    def stage(self, stage, message):
+        """Starts the next stage."""
+        self.meter.start(stage)
+        self.stage_name, self.message = stage, message
+        self.emit(stage, message, self.step)
+        self.step += 1
+
+    def items(self, unit):
+        """Returns an `on_progress(done, total)` hook reporting items of the current stage."""
+        def on_progress(done, total=None):
+            now = time.monotonic()
+            if done != total and now - self.last_item_event < ITEM_EVENT_INTERVAL:
+                return
+            self.last_item_event = now
+            self.emit(self.stage_name, self.message, self.step - 1, done, total, unit)
+        return on_progress
+
+    def complete(self, message):
+        self.status = 'complete'
+        self.emit('complete', message, self.total_steps)
+
+    def fail(self, error):
+        self.status = 'error'
+        self.emit('error', str(error), self.step)
+
+    def cleanup(self, message):
+        """Reports the cleanup that runs after the analysis, whatever its outcome."""
+        self.meter.start('cleanup')
+        self.emit('cleanup', message, self.total_steps)
+
+    def finish(self):
+        """Ends the last stage and sends and returns the run summary."""
+        summary = dict(self.meter.summary(), status=self.status if self.status != 'running' else 'stopped')
+        message = (f"⏱️ Finished in {summary['wall']:.1f}s (CPU {summary['cpu']:.1f}s, "
+                   f"{summary['git_processes']} git processes)")
+        self.emit('finished', message, self.total_steps, summary=summary)
+        return summary
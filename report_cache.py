@@ -0,0 +1,98 @@
+import gzip
+import hashlib
+import html
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+import markdown
+from markdown.treeprocessors import Treeprocessor
+
+DEFAULT_MAX_SIZE_MB = 64
+
+# Link targets kept in rendered reports; relative URLs have no scheme.
+SAFE_URL_SCHEMES = ('http', 'https', 'mailto')
+URL_SCHEME = re.compile(r'^([a-z][a-z0-9+.-]*):')
+# Browsers ignore these inside a scheme, so 'java\tscript:' still runs.
+IGNORED_URL_CHARS = re.compile(r'[\x00-\x20\x7f]+')
+
+RenderedReport = namedtuple('RenderedReport', ['body', 'gzipped', 'etag', 'last_modified'])
+
+
+def default_max_bytes():
+    """Returns the rendered report cache limit from QGIT_REPORT_CACHE_MB."""
+    return int(os.environ.get('QGIT_REPORT_CACHE_MB', DEFAULT_MAX_SIZE_MB)) * 1024 * 1024
+
+
+def is_safe_url(url):
+    """Tells whether a link target is an http, https, mailto or relative URL."""
+    scheme = URL_SCHEME.match(IGNORED_URL_CHARS.sub('', html.unescape(url)).lower())
+    return scheme is None or scheme.group(1) in SAFE_URL_SCHEMES
+
+
+class UnsafeLinkRemover(Treeprocessor):
+    """Drops the targets of links and images with other schemes (javascript:, data:, ...), keeping their text."""
+
+    def run(self, root):
+        for element in root.iter():
+            for attribute in ('href', 'src'):
+                if element.get(attribute) is not None and not is_safe_url(element.get(attribute)):
+                    del element.attrib[attribute]
+
+
+def render_markdown(text):
+    """Converts a Markdown report to HTML."""
+    md = markdown.Markdown(extensions=['tables', 'fenced_code'])
+    # Reports quote commit messages and file names of the analyzed repository; show HTML in them as text.
+    md.preprocessors.deregister('html_block')
+    md.inlinePatterns.deregister('html')
+    # After the inline patterns (priority 20) have made the links.
+    md.treeprocessors.register(UnsafeLinkRemover(md), 'unsafe_links', 5)
+    return md.convert(text)
+
+
+class RenderedReportCache:
+    """Keeps report pages rendered to HTML, plain and gzipped, in a size-bounded LRU.
+
+    Entries are keyed by path and remember the file's mtime and size, so a
+    report written again by a new analysis is rendered again on its next view.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or default_max_bytes()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, path, render_page):
+        """Returns the RenderedReport of a Markdown file; `render_page(html)` wraps the report HTML in a page."""
+        stat = os.stat(path)
+        key, signature = str(path), (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self.entries.move_to_end(key)
+                return entry[1]
+
+        with open(path, 'r', encoding='utf-8') as f:
+            body = render_page(render_markdown(f.read())).encode('utf-8')
+        rendered = RenderedReport(body, gzip.compress(body, compresslevel=6),
+                                  hashlib.sha1(body).hexdigest(), stat.st_mtime)
+        self.put(key, signature, rendered)
+        return rendered
+
+    def put(self, key, signature, rendered):
+        cost = len(rendered.body) + len(rendered.gzipped)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+            # A page larger than the whole cache is served but not kept.
+            if cost > self.max_bytes:
+                return
+            self.entries[key] = (signature, rendered, cost)
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
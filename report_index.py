@@ -0,0 +1,159 @@
+import os
+import sqlite3
+
+INDEX_FILE = 'report_index.sqlite'
+ROWS_PER_PAGE = 100
+# Rows kept in memory before they are written to the index
+ROW_BATCH = 10000
+
+SCHEMA = """
+CREATE TABLE reports (name TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL);
+CREATE TABLE sections (
+    report TEXT NOT NULL,
+    author TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (report, author)
+);
+CREATE TABLE rows (
+    report TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    author TEXT NOT NULL,
+    date TEXT NOT NULL,
+    PRIMARY KEY (report, start)
+) WITHOUT ROWID;
+CREATE INDEX rows_by_author ON rows (report, author, start);
+CREATE INDEX rows_by_date ON rows (report, date);
+"""
+
+
+class ReportIndexWriter:
+    """Records the byte ranges of the header and of every table row of the paged reports.
+
+    A report's own header is the section of author ''; contributors.md also
+    has a section (heading and table header) per author. Like the analysis
+    artifact, the index is built in a temporary file and replaces the
+    previous one in finish().
+    """
+
+    def __init__(self, report_dir):
+        self.report_dir = report_dir
+        self.path = report_dir / INDEX_FILE
+        self.temp_path = report_dir / (INDEX_FILE + '.tmp')
+        if self.temp_path.exists():
+            self.temp_path.unlink()
+        self.conn = sqlite3.connect(str(self.temp_path))
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.executescript(SCHEMA)
+        self.pending = []
+
+    def add_section(self, report, start, end, author=''):
+        self.conn.execute("INSERT INTO sections VALUES (?, ?, ?, ?)", (report, author, start, end - start))
+
+    def add_row(self, report, start, end, author, date):
+        self.pending.append((report, start, end - start, author, date))
+        if len(self.pending) >= ROW_BATCH:
+            self.flush()
+
+    def flush(self):
+        self.conn.executemany("INSERT INTO rows VALUES (?, ?, ?, ?, ?)", self.pending)
+        self.pending = []
+
+    def finish(self, reports):
+        """Saves the size and modification time of the finished reports and moves the index into place."""
+        self.flush()
+        for name in reports:
+            stat = os.stat(self.report_dir / name)
+            self.conn.execute("INSERT INTO reports VALUES (?, ?, ?)", (name, stat.st_size, stat.st_mtime_ns))
+        self.conn.commit()
+        self.conn.close()
+        self.conn = None
+        os.replace(self.temp_path, self.path)
+
+    def close(self):
+        """Drops the index if it was not finished."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+            self.temp_path.unlink()
+
+
+def open_report_index(report_dir, report):
+    """Opens the index of a report read-only, or returns None if it has none or the report changed since."""
+    path = report_dir / INDEX_FILE
+    if not path.exists():
+        return None
+    conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    row = conn.execute("SELECT size, mtime_ns FROM reports WHERE name = ?", (report,)).fetchone()
+    stat = os.stat(report_dir / report)
+    if row != (stat.st_size, stat.st_mtime_ns):
+        conn.close()
+        return None
+    return conn
+
+
+def read_ranges(f, ranges):
+    """Reads (start, length) ranges of a file, one read per run of adjacent ranges."""
+    runs = []
+    for start, length in ranges:
+        if runs and runs[-1][0] + runs[-1][1] == start:
+            runs[-1][1] += length
+        else:
+            runs.append([start, length])
+    chunks = []
+    for start, length in runs:
+        f.seek(start)
+        chunks.append(f.read(length))
+    return b''.join(chunks)
+
+
+def read_page(report_dir, report, page=1, author=None, since=None, until=None, per_page=ROWS_PER_PAGE):
+    """Returns one page of the rows of timeline.md or contributors.md as Markdown, with its header.
+
+    Rows can be limited to an author and to dates from `since` to `until`
+    (YYYY-MM-DD or a longer prefix, both included). Only the bytes of the
+    header and of the rows on the page are read from the report. Returns
+    a dict with text, page, pages and total (matching rows), or None when
+    the report has no up-to-date index.
+    """
+    conn = open_report_index(report_dir, report)
+    if conn is None:
+        return None
+    try:
+        where, params = ["report = ?"], [report]
+        if author:
+            where.append("author = ?")
+            params.append(author)
+        if since:
+            where.append("date >= ?")
+            params.append(since)
+        if until:
+            # Every date starting with `until` sorts before this.
+            where.append("date <= ?")
+            params.append(until + '\uffff')
+        condition = ' AND '.join(where)
+        total = conn.execute(f"SELECT COUNT(*) FROM rows WHERE {condition}", params).fetchone()[0]
+        pages = max(1, -(-total // per_page))
+        page = min(max(page, 1), pages)
+        rows = conn.execute(f"SELECT start, length, author FROM rows WHERE {condition} ORDER BY start LIMIT ? OFFSET ?",
+                            params + [per_page, (page - 1) * per_page]).fetchall()
+        sections = {name: (start, length) for name, start, length in
+                    conn.execute("SELECT author, start, length FROM sections WHERE report = ?", (report,))}
+    finally:
+        conn.close()
+
+    with open(report_dir / report, 'rb') as f:
+        parts = [read_ranges(f, [sections['']])]
+        group = []
+        for start, length, row_author in rows:
+            # contributors.md repeats the heading and table header of each author.
+            if row_author in sections and (not group or group[-1][2] != row_author):
+                if group:
+                    parts.append(read_ranges(f, [(start, length) for start, length, _ in group]) + b'\n')
+                    group = []
+                parts.append(read_ranges(f, [sections[row_author]]))
+            group.append((start, length, row_author))
+        parts.append(read_ranges(f, [(start, length) for start, length, _ in group]))
+    return {'text': b''.join(parts).decode('utf-8'), 'page': page, 'pages': pages, 'total': total}
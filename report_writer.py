@@ -0,0 +1,45 @@
+import shutil
+import tempfile
+
+# Bytes of a report body kept in memory for full_report.md before it moves to a temporary file.
+SECTION_BUFFER_BYTES = 1024 * 1024
+
+
+class ReportWriter:
+    """Writes one Markdown report and keeps its body, without the signature, for full_report.md.
+
+    The body buffer stays in memory until it reaches SECTION_BUFFER_BYTES
+    and then moves to a temporary file. The report is written as UTF-8 with
+    \n line endings on every platform, so tell() offsets can be indexed.
+    """
+
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature
+        self.file = None
+        self.body = tempfile.SpooledTemporaryFile(max_size=SECTION_BUFFER_BYTES, mode='w+', encoding='utf-8')
+
+    def __enter__(self):
+        self.file = open(self.path, 'wb')
+        return self
+
+    def write(self, text):
+        self.file.write(text.encode('utf-8'))
+        self.body.write(text)
+
+    def tell(self):
+        """Returns the byte offset in the report where the next write starts."""
+        return self.file.tell()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.file.write(self.signature.encode('utf-8'))
+        self.file.close()
+
+    def copy_body(self, f):
+        """Writes the report body to another open file."""
+        self.body.seek(0)
+        shutil.copyfileobj(self.body, f)
+
+    def close(self):
+        self.body.close()
@@ -0,0 +1,56 @@
+import math
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+# Bits of each SHA used as its hash; ranks then stay below 64 and fit in a byte register.
+HASH_BITS = 64
+
+
+def precision_for_error(error):
+    """Returns the smallest sketch precision whose standard error is at most `error` (e.g. 0.02 for 2%)."""
+    if not 0 < error < 1:
+        raise ValueError("The error bound must be between 0 and 1, e.g. 0.02 for 2%.")
+    return min(MAX_PRECISION, max(MIN_PRECISION, math.ceil(math.log2((1.04 / error) ** 2))))
+
+
+class HyperLogLog:
+    """A HyperLogLog sketch estimating how many distinct commits were added to it.
+
+    It takes 2**precision bytes however much history it sees; the standard
+    error of estimate() is about 1.04 / sqrt(2**precision). Commit SHAs are
+    already uniformly distributed, so their first 64 bits serve as the hash.
+    """
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @property
+    def standard_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, sha):
+        value = int(sha[:HASH_BITS // 4], 16)
+        rest_bits = HASH_BITS - self.precision
+        rest = value & ((1 << rest_bits) - 1)
+        rank = rest_bits - rest.bit_length() + 1
+        index = value >> rest_bits
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Adds everything another sketch of the same precision has seen."""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        """Returns the estimated number of distinct commits, rounded to an integer."""
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        total = sum(self.registers.count(rank) * 2.0 ** -rank for rank in range(HASH_BITS - self.precision + 2))
+        estimate = alpha * m * m / total
+        zeros = self.registers.count(0)
+        # Small counts are estimated far better by linear counting of empty registers.
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# The modules live at the top of the repository.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# (author, date, path) of the commits of the sample repository.
+SAMPLE_COMMITS = [
+    ('Alice', '2024-01-01T10:00:00 +0000', 'src/app.py'),
+    ('Bob', '2024-01-02T10:00:00 +0000', 'src/util.py'),
+    ('Alice', '2024-01-03T10:00:00 +0000', 'docs/guide.md'),
+    ('Bob', '2024-01-04T10:00:00 +0000', 'src/app.py'),
+    ('Alice', '2024-01-05T10:00:00 +0000', 'README.md'),
+    ('Bob', '2024-01-06T10:00:00 +0000', 'src/util.py'),
+    ('Alice', '2024-01-07T10:00:00 +0000', 'src/app.py'),
+]
+
+
+@pytest.fixture(autouse=True)
+def blob_cache(tmp_path, monkeypatch):
+    """Keeps the analyses of the tests out of the user's blob cache."""
+    monkeypatch.setenv('QGIT_BLOB_CACHE', str(tmp_path / 'blob_cache.sqlite'))
+
+
+@pytest.fixture(scope='session')
+def sample_report(tmp_path_factory):
+    """Analyzes a small repository of two authors once and returns its report directory."""
+    from main import analyze_repo
+
+    root = tmp_path_factory.mktemp('sample')
+    repo = root / 'sample'
+    repo.mkdir()
+    subprocess.run(['git', 'init', '-q', '-b', 'main'], cwd=repo, check=True)
+    for number, (author, date, path) in enumerate(SAMPLE_COMMITS):
+        (repo / path).parent.mkdir(parents=True, exist_ok=True)
+        with open(repo / path, 'a') as f:
+            f.write(f"line {number}\n")
+        env = dict(os.environ, GIT_AUTHOR_NAME=author, GIT_AUTHOR_EMAIL=f"{author.lower()}@example.com",
+                   GIT_COMMITTER_NAME=author, GIT_COMMITTER_EMAIL=f"{author.lower()}@example.com",
+                   GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+        subprocess.run(['git', 'add', path], cwd=repo, env=env, check=True)
+        subprocess.run(['git', 'commit', '-q', '-m', f"Change {path}"], cwd=repo, env=env, check=True)
+
+    analyze_repo(str(repo), reports_dir=root / 'reports', blob_cache=root / 'blob_cache.sqlite',
+                 progress_callback=lambda event: None)
+    return root / 'reports' / 'sample'
@@ -0,0 +1,68 @@
+import sqlite3
+
+import pytest
+
+import web
+from artifact import SCHEMA_VERSION, has_tree_index, list_children, open_artifact, read_meta
+from conftest import SAMPLE_COMMITS
+
+
+def test_artifact_holds_the_analysis(sample_report):
+    conn = open_artifact(sample_report)
+    try:
+        meta = read_meta(conn)
+        commits = conn.execute("SELECT date, author, insertions, deletions FROM commits ORDER BY seq").fetchall()
+        authors = {row['name']: row['commit_count'] for row in conn.execute("SELECT * FROM authors")}
+        files = {row['path']: (row['parent'], row['lines'], row['commit_count']) for row in conn.execute("SELECT * FROM files")}
+    finally:
+        conn.close()
+
+    assert meta['schema_version'] == str(SCHEMA_VERSION)
+    assert meta['repo_name'] == 'sample'
+    assert [(row['date'], row['author']) for row in commits] == [
+        (date[:19].replace('T', ' '), author) for author, date, _ in SAMPLE_COMMITS]
+    assert all((row['insertions'], row['deletions']) == (1, 0) for row in commits)
+    assert authors == {'Alice': 4, 'Bob': 3}
+    assert files == {'README.md': ('', 1, 1), 'docs/guide.md': ('docs', 1, 1),
+                     'src/app.py': ('src', 3, 3), 'src/util.py': ('src', 2, 2)}
+
+
+def test_artifact_is_read_only(sample_report):
+    conn = open_artifact(sample_report)
+    try:
+        with pytest.raises(sqlite3.OperationalError, match='readonly'):
+            conn.execute("DELETE FROM commits")
+    finally:
+        conn.close()
+
+
+def test_missing_artifact_asks_for_an_analysis(tmp_path):
+    with pytest.raises(FileNotFoundError, match='analyze the repository first'):
+        open_artifact(tmp_path)
+
+
+def test_list_children_pages_folders_before_files(sample_report):
+    conn = open_artifact(sample_report)
+    try:
+        assert has_tree_index(read_meta(conn))
+        first, total = list_children(conn, '', 0, 2)
+        rest, _ = list_children(conn, '', 2, 2)
+        src, src_total = list_children(conn, 'src')
+    finally:
+        conn.close()
+
+    assert total == 3
+    assert [(child['path'], child['dir']) for child in first + rest] == [('docs', True), ('src', True), ('README.md', False)]
+    assert first[1] == {'name': 'src', 'path': 'src', 'dir': True, 'lines': 5, 'commit_count': 5}
+    assert src_total == 2 and [child['name'] for child in src] == ['app.py', 'util.py']
+
+
+def test_tree_api(sample_report, monkeypatch):
+    monkeypatch.setattr(web, 'reports_dir', sample_report.parent)
+    client = web.app.test_client()
+
+    data = client.get('/api/reports/sample/tree?path=/src/&offset=1').get_json()
+    assert (data['path'], data['offset'], data['total']) == ('src', 1, 2)
+    assert [child['path'] for child in data['children']] == ['src/util.py']
+    assert client.get('/api/reports/missing/tree').status_code == 404
+    assert client.get('/api/reports/..%2F..%2Fetc/tree').status_code == 404
@@ -0,0 +1,39 @@
+import batch
+
+
+class FakeProcess:
+    """Stands in for a `main.py --repo` child that exits after a few polls."""
+
+    def __init__(self, polls):
+        self.polls = polls
+        self.returncode = None
+
+    def poll(self):
+        self.polls -= 1
+        if self.polls <= 0:
+            self.returncode = 0
+        return self.returncode
+
+
+def test_same_named_repositories_do_not_run_together(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(batch, 'POLL_INTERVAL', 0)
+    running = {}
+    overlaps = []
+
+    def start_analysis(repo_url, log_path, *args):
+        for other, proc in running.items():
+            if proc.returncode is None and batch.Path(other) == log_path.parent:
+                overlaps.append(repo_url)
+        proc = FakeProcess(3)
+        running[str(log_path.parent)] = proc
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        return proc, open(log_path, 'w', encoding='utf-8')
+
+    monkeypatch.setattr(batch, 'start_analysis', start_analysis)
+    entries = ['https://github.com/a/proj', 'https://github.com/b/proj', 'https://github.com/c/other']
+    results = batch.run_batch(entries, concurrency=3)
+
+    assert overlaps == []
+    assert sorted(result['repo'] for result in results) == sorted(entries)
+    assert all(result['status'] == 'success' for result in results)
@@ -0,0 +1,41 @@
+import subprocess
+from pathlib import Path
+
+from blob_cache import default_cache_path, lookup_blobs
+from main import analyze_repo
+
+
+def test_default_path_follows_the_mirror_cache(tmp_path, monkeypatch):
+    monkeypatch.delenv('QGIT_BLOB_CACHE', raising=False)
+    assert default_cache_path(tmp_path / 'mirrors') == tmp_path / 'mirrors' / 'blob_cache.sqlite'
+    assert default_cache_path() == Path.home() / '.cache' / 'q-git' / 'blob_cache.sqlite'
+    monkeypatch.setenv('QGIT_BLOB_CACHE', str(tmp_path / 'blobs.sqlite'))
+    assert default_cache_path(tmp_path / 'mirrors') == tmp_path / 'blobs.sqlite'
+
+
+def test_filtered_checkouts_are_not_cached_as_blobs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    repo = tmp_path / 'proj'
+    repo.mkdir()
+    (repo / '.gitattributes').write_text("*.dat filter=double\n")
+    (repo / 'big.dat').write_text("one\ntwo\n")
+    (repo / 'plain.txt').write_text("one\ntwo\n")
+    for args in (['init', '-q'], ['add', '.'], ['-c', 'user.name=A', '-c', 'user.email=a@example.com', 'commit', '-q', '-m', 'add']):
+        subprocess.run(['git', *args], cwd=repo, check=True)
+    blob, plain = subprocess.run(['git', 'rev-parse', 'HEAD:big.dat', 'HEAD:plain.txt'], cwd=repo, check=True,
+                                 capture_output=True, text=True).stdout.split()
+    # Checking out big.dat doubles each of its lines.
+    monkeypatch.setenv('GIT_CONFIG_COUNT', '1')
+    monkeypatch.setenv('GIT_CONFIG_KEY_0', 'filter.double.smudge')
+    monkeypatch.setenv('GIT_CONFIG_VALUE_0', 'sed p')
+    cache = tmp_path / 'blob_cache.sqlite'
+
+    analyze_repo(str(repo), force_clone=True, blob_cache=cache, progress_callback=lambda event: None)
+    assert '- `big.dat` (Lines: 4' in (tmp_path / 'reports' / 'proj' / 'folder_structure.md').read_text()
+    assert lookup_blobs([blob, plain], cache) == {plain: 2}
+
+    # Without a working tree the blob itself is counted, and cached.
+    analyze_repo(str(repo), clone_mode='bare', force_clone=True, incremental=False, blob_cache=cache,
+                 progress_callback=lambda event: None)
+    assert '- `big.dat` (Lines: 2' in (tmp_path / 'reports' / 'proj' / 'folder_structure.md').read_text()
+    assert lookup_blobs([blob], cache) == {blob: 2}
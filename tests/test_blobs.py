@@ -0,0 +1,30 @@
+import io
+
+import pytest
+
+from blobs import count_lines
+
+
+def text_mode_lines(data):
+    return sum(1 for _ in io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', errors='ignore'))
+
+
+@pytest.mark.parametrize('data, lines', [
+    (b'', 0),
+    (b'one\ntwo\n', 2),
+    (b'one\ntwo', 2),
+    (b'one\r\ntwo\r\n', 2),
+    (b'one\rtwo\r', 2),
+    (b'one\r\rtwo', 3),
+    (b'\xff\xfe', 0),
+    (b'one\n\x80', 1),
+    # The decoder drops the byte between them, leaving one '\r\n'.
+    (b'\r\x80\n', 1),
+    (b'caf\xc3\xa9\r\n\xe2\x82\xac', 2),
+])
+def test_count_lines_matches_text_mode(data, lines):
+    assert text_mode_lines(data) == lines
+    assert count_lines([data]) == lines
+    # However the blob is split into chunks.
+    for cut in range(len(data) + 1):
+        assert count_lines([data[:cut], data[cut:]]) == lines
@@ -0,0 +1,50 @@
+from catalog import list_reports, rebuild_catalog, record_report
+
+
+def make_report(reports_dir, name):
+    report_dir = reports_dir / name
+    report_dir.mkdir(parents=True)
+    (report_dir / 'repo_info.md').write_text(f"# {name}\n")
+    record_report(report_dir)
+    return report_dir
+
+
+def test_finished_analysis_is_in_the_catalog(sample_report):
+    entries, total = list_reports(sample_report.parent)
+    assert total == 1
+    entry = entries[0]
+    assert (entry['name'], entry['kind'], entry['repo_url']) == ('sample', 'repo', str(sample_report.parent.parent / 'sample'))
+    assert {f['name'] for f in entry['files']} == {path.name for path in sample_report.glob('*.md')}
+    assert entry['size'] == sum(f['size'] for f in entry['files'])
+
+
+def test_list_reports_pages_and_filters(tmp_path):
+    for name in ('alpha', 'beta_repo', 'user_carol', 'gamma'):
+        make_report(tmp_path, name)
+
+    entries, total = list_reports(tmp_path, per_page=3, sort='name')
+    assert total == 4 and [e['name'] for e in entries] == ['alpha', 'beta_repo', 'gamma']
+    entries, _ = list_reports(tmp_path, page=2, per_page=3, sort='name')
+    assert [e['name'] for e in entries] == ['user_carol']
+
+    assert [e['name'] for e in list_reports(tmp_path, kind='user')[0]] == ['user_carol']
+    assert [e['name'] for e in list_reports(tmp_path, query='et')[0]] == ['beta_repo']
+    # LIKE wildcards in the query match literally.
+    assert [e['name'] for e in list_reports(tmp_path, query='a_r', sort='name')[0]] == ['beta_repo']
+    assert list_reports(tmp_path, query='%')[1] == 0
+
+
+def test_reports_are_refreshed_and_rebuilt(tmp_path):
+    report_dir = make_report(tmp_path, 'alpha')
+    (report_dir / 'timeline.md').write_text("# Timeline\n")
+    record_report(report_dir)
+    entries, _ = list_reports(tmp_path)
+    assert [f['name'] for f in entries[0]['files']] == ['repo_info.md', 'timeline.md']
+
+    # A report directory with no reports left drops out of the catalog.
+    for path in report_dir.glob('*.md'):
+        path.unlink()
+    (tmp_path / 'beta').mkdir()
+    (tmp_path / 'beta' / 'repo_info.md').write_text("# beta\n")
+    rebuild_catalog(tmp_path)
+    assert [e['name'] for e in list_reports(tmp_path)[0]] == ['beta']
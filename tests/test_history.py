@@ -0,0 +1,90 @@
+import os
+import subprocess
+
+import git
+import pytest
+
+from history import LOG_ARGS, collect_history, iter_commits_with_changes
+
+
+def run_git(repo, *args):
+    env = dict(os.environ, GIT_AUTHOR_NAME='A', GIT_AUTHOR_EMAIL='a@example.com',
+               GIT_COMMITTER_NAME='A', GIT_COMMITTER_EMAIL='a@example.com')
+    return subprocess.run(['git', *args], cwd=repo, env=env, check=True, capture_output=True).stdout.decode()
+
+
+def write(repo, path, text):
+    (repo / path).parent.mkdir(parents=True, exist_ok=True)
+    (repo / path).write_bytes(text if isinstance(text, bytes) else text.encode())
+
+
+def commit(repo, message):
+    run_git(repo, 'add', '-A')
+    run_git(repo, 'commit', '-q', '-m', message)
+
+
+@pytest.fixture(scope='module')
+def repo(tmp_path_factory):
+    """A small history with renames (one with edits), a copy, binary changes and a merged branch that renames."""
+    path = tmp_path_factory.mktemp('history') / 'proj'
+    path.mkdir()
+    run_git(path, 'init', '-q', '-b', 'main')
+    write(path, 'a.txt', ''.join(f"a line {i}\n" for i in range(20)))
+    write(path, 'b.txt', ''.join(f"b line {i}\n" for i in range(20)))
+    write(path, 'img.bin', b'\0\1\2' * 100)
+    commit(path, 'add files')
+    write(path, 'src dir/a.txt', (path / 'a.txt').read_text().replace('a line 3\n', 'a line three\n'))
+    os.remove(path / 'a.txt')
+    commit(path, 'rename a.txt with an edit')
+    write(path, 'copy.txt', (path / 'b.txt').read_text())
+    write(path, 'img.bin', b'\0\3\4' * 100)
+    commit(path, 'copy b.txt and change the binary')
+    run_git(path, 'checkout', '-q', '-b', 'topic')
+    (path / 'lib').mkdir()
+    os.rename(path / 'src dir' / 'a.txt', path / 'lib' / 'a.txt')
+    commit(path, 'move a.txt on a branch')
+    write(path, 'lib/a.txt', (path / 'lib' / 'a.txt').read_text() + "more\n")
+    commit(path, 'edit a.txt on the branch')
+    run_git(path, 'checkout', '-q', 'main')
+    write(path, 'b.txt', (path / 'b.txt').read_text() + "b more\n")
+    commit(path, 'edit b.txt')
+    run_git(path, 'merge', '-q', '--no-edit', 'topic')
+    write(path, 'lib/a.txt', (path / 'lib' / 'a.txt').read_text() + "after merge\n")
+    write(path, 'copy.txt', "rewritten\n")
+    commit(path, 'edit after the merge')
+    return git.Repo(path)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_file_commits_match_git_log_follow(repo, workers):
+    tracked = [path for path in repo.git.ls_files('-z').split('\0') if path]
+    history = collect_history(repo, tracked, workers=workers)
+
+    assert sorted(tracked) == ['b.txt', 'copy.txt', 'img.bin', 'lib/a.txt']
+    for path in tracked:
+        expected = set(repo.git.log('--follow', '--format=%H', '--', path).split())
+        assert history['files'][path] == expected, path
+    assert history['renames']['lib/a.txt'] == ['src dir/a.txt', 'a.txt']
+
+
+def test_line_counts_of_renames_copies_and_binaries(repo):
+    proc = repo.git.log(*LOG_ARGS, as_process=True)
+    parsed = {sha: (insertions[0], deletions[0]) for sha, _, _, insertions, deletions in iter_commits_with_changes(proc.stdout)}
+    proc.wait()
+
+    expected = {}
+    sha = None
+    plain = repo.git.log('--format=%x01%H', '--numstat', '--find-copies-harder', '--diff-merges=first-parent')
+    for line in plain.splitlines():
+        if line.startswith('\x01'):
+            sha = line[1:]
+            expected[sha] = (0, 0)
+        elif line:
+            added, deleted, _ = line.split('\t', 2)
+            expected[sha] = (expected[sha][0] + (int(added) if added != '-' else 0),
+                             expected[sha][1] + (int(deleted) if deleted != '-' else 0))
+    assert parsed == expected
+    # The edited rename counts its one changed line; the copy and the binary change count nothing.
+    messages = {commit.message.strip(): commit.hexsha for commit in repo.iter_commits()}
+    assert parsed[messages['rename a.txt with an edit']] == (1, 1)
+    assert parsed[messages['copy b.txt and change the binary']] == (0, 0)
@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import subprocess
+
+from main import analyze_repo
+
+
+def git(repo, *args, date=None):
+    env = dict(os.environ, GIT_AUTHOR_NAME='A', GIT_AUTHOR_EMAIL='a@example.com',
+               GIT_COMMITTER_NAME='A', GIT_COMMITTER_EMAIL='a@example.com')
+    if date:
+        env.update(GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+    return subprocess.run(['git', *args], cwd=repo, env=env, check=True, capture_output=True, text=True).stdout
+
+
+def commit(repo, path, date):
+    (repo / path).write_text(f"{path} {date}\n")
+    git(repo, 'add', path)
+    git(repo, 'commit', '-q', '-m', f"{path} {date}", date=date)
+
+
+def timeline(report_dir, columns='seq, sha'):
+    conn = sqlite3.connect(str(report_dir / 'analysis.sqlite'))
+    try:
+        return conn.execute(f"SELECT {columns} FROM commits ORDER BY seq").fetchall()
+    finally:
+        conn.close()
+
+
+def analyze(repo, incremental=True, **window):
+    analyze_repo(str(repo), incremental=incremental, progress_callback=lambda event: None, **window)
+    return timeline(repo.parent / 'reports' / repo.name)
+
+
+def test_merging_older_commits_matches_a_full_build(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    repo = tmp_path / 'proj'
+    repo.mkdir()
+    git(repo, 'init', '-q', '-b', 'main')
+    commit(repo, 'a.txt', '2024-01-01T00:00:00')
+    git(repo, 'checkout', '-q', '-b', 'topic')
+    commit(repo, 'b.txt', '2024-01-02T00:00:00')
+    git(repo, 'checkout', '-q', 'main')
+    commit(repo, 'c.txt', '2024-01-03T00:00:00')
+    analyze(repo)
+
+    # The branch brings in a commit older than the newest one already analyzed.
+    git(repo, 'merge', '-q', '--no-edit', 'topic', date='2024-01-04T00:00:00')
+    assert analyze(repo) == analyze(repo, incremental=False)
+
+
+def test_relative_window_is_not_reused_after_it_moved(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    repo = tmp_path / 'proj'
+    repo.mkdir()
+    git(repo, 'init', '-q', '-b', 'main')
+    commit(repo, 'a.txt', '2024-01-01T10:00:00 +0000')
+    commit(repo, 'b.txt', '2024-01-01T11:00:00 +0000')
+    # git reads "now" from GIT_TEST_DATE_NOW: 11:30, then 15:00.
+    monkeypatch.setenv('GIT_TEST_DATE_NOW', str(1704067200 + 11 * 3600 + 1800))
+    assert len(analyze(repo, since='2 hours ago')) == 2
+
+    commit(repo, 'c.txt', '2024-01-01T14:00:00 +0000')
+    monkeypatch.setenv('GIT_TEST_DATE_NOW', str(1704067200 + 15 * 3600))
+    rows = analyze(repo, since='2 hours ago')
+    assert [sha for _, sha in rows] == [git(repo, 'rev-parse', 'HEAD').strip()]
+    assert rows == analyze(repo, incremental=False, since='2 hours ago')
+
+
+def test_since_window_through_a_shallow_clone_with_a_merge(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('QGIT_CACHE_DIR', raising=False)
+    repo = tmp_path / 'proj'
+    repo.mkdir()
+    git(repo, 'init', '-q', '-b', 'main')
+    commit(repo, 'a.txt', '2024-01-01T00:00:00 +0000')
+    git(repo, 'checkout', '-q', '-b', 'topic')
+    commit(repo, 'b.txt', '2024-01-02T00:00:00 +0000')
+    git(repo, 'checkout', '-q', 'main')
+    commit(repo, 'c.txt', '2024-01-03T00:00:00 +0000')
+    git(repo, 'merge', '-q', '--no-edit', 'topic', date='2024-01-04T00:00:00 +0000')
+    commit(repo, 'd.txt', '2024-01-05T00:00:00 +0000')
+    report_dir = tmp_path / 'reports' / 'proj'
+
+    # The first window makes git record a shallow boundary it cannot deepen.
+    for since in ('2024-01-02 12:00 +0000', '2024-01-03 12:00 +0000', '2024-01-04 12:00 +0000'):
+        analyze_repo(str(repo), since=since, incremental=False, progress_callback=lambda event: None)
+        in_place = timeline(report_dir, 'sha, insertions, deletions')
+        analyze_repo(str(repo), since=since, incremental=False, force_clone=True, progress_callback=lambda event: None)
+        assert timeline(report_dir, 'sha, insertions, deletions') == in_place
@@ -0,0 +1,33 @@
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from instrumentation import StageMeter, current_rss_kb
+
+
+@pytest.mark.skipif(current_rss_kb() is None, reason="needs /proc")
+def test_each_stage_reports_its_own_peak_memory():
+    meter = StageMeter()
+    meter.start('big')
+    block = bytearray(200 * 1024 * 1024)
+    time.sleep(0.2)
+    del block
+    meter.start('small')
+    time.sleep(0.2)
+    big, small = meter.summary()['stages']
+
+    assert big['peak_rss_kb'] - small['peak_rss_kb'] > 100 * 1024
+
+
+def test_git_processes_of_thread_pools_count_for_the_stage():
+    meter = StageMeter()
+    meter.start('pool')
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: subprocess.run(['git', '--version'], capture_output=True), range(8)))
+    meter.start('idle')
+    pool, idle = meter.summary()['stages']
+
+    assert pool['git_processes'] == 8
+    assert idle['git_processes'] == 0
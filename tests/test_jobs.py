@@ -0,0 +1,74 @@
+import os
+import subprocess
+import time
+
+import jobs
+from jobs import Job, JobManager
+from progress import ProgressReporter
+
+
+def hang(pid_file, progress_callback=None):
+    """An analysis whose clone hangs without reporting progress."""
+    proc = subprocess.Popen(['sleep', '60'])
+    with open(pid_file, 'w') as f:
+        f.write(str(proc.pid))
+    proc.wait()
+
+
+def slow_cleanup(done_file, progress_callback=None):
+    """An analysis whose cleanup takes longer than the grace period of a stop."""
+    progress = ProgressReporter(1, progress_callback)
+    progress.stage('clone', "Cloning")
+    try:
+        time.sleep(60)
+    finally:
+        progress.cleanup("Cleaning up")
+        time.sleep(2)
+        with open(done_file, 'w') as f:
+            f.write('done')
+
+
+def process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_timeout_stops_analysis_without_progress(tmp_path):
+    manager = JobManager(max_workers=1, timeout=2)
+    pid_file = tmp_path / 'child.pid'
+    job = manager.submit('repo', 'https://github.com/a/hang', 'EN', hang, str(pid_file))
+    job.future.result(timeout=60)
+
+    assert job.status == 'Timed out'
+    pid = int(pid_file.read_text())
+    deadline = time.time() + 5
+    while process_exists(pid) and time.time() < deadline:
+        time.sleep(0.1)
+    assert not process_exists(pid)
+
+
+def test_jobs_share_lock_and_identity_by_report_directory():
+    https = Job('repo', 'https://github.com/A/proj.git', 'EN')
+    ssh = Job('repo', 'git@github.com:a/proj', 'EN')
+    fork = Job('repo', 'https://github.com/b/proj', 'EN')
+
+    assert https.key == ssh.key
+    assert fork.key != https.key
+    assert fork.report_dir == ssh.report_dir
+
+
+def test_stopped_analysis_is_not_killed_while_cleaning_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'TERMINATE_GRACE_SECONDS', 0.5)
+    manager = JobManager(max_workers=1)
+    done_file = tmp_path / 'cleaned'
+    job = manager.submit('repo', 'https://github.com/a/slow', 'EN', slow_cleanup, str(done_file))
+    while job.event is None:
+        time.sleep(0.05)
+    manager.cancel(job.id)
+    job.future.result(timeout=60)
+
+    assert job.status == 'Cancelled'
+    assert done_file.read_text() == 'done'
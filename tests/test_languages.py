@@ -0,0 +1,30 @@
+import subprocess
+
+import git
+
+from blobs import list_tree, read_blobs
+from languages import classify_tree
+from main import detect_languages
+
+
+def test_scripts_are_classified_from_the_start_of_their_blob(tmp_path):
+    subprocess.run(['git', 'init', '-q', str(tmp_path)], check=True)
+    (tmp_path / 'tool').write_bytes(b'#!/usr/bin/env python3\n' + b'x = 1\n' * 100000)
+    (tmp_path / 'data').write_bytes(b'\0\1\2' * 1000)
+    subprocess.run(['git', '-C', str(tmp_path), 'add', '.'], check=True)
+    subprocess.run(['git', '-C', str(tmp_path), '-c', 'user.name=A', '-c', 'user.email=a@example.com',
+                    'commit', '-q', '-m', 'first'], check=True)
+    repo = git.Repo(tmp_path)
+    entries = list_tree(repo)
+    shas = {path: sha for path, _, _, sha, _ in entries}
+
+    heads = read_blobs(repo, [shas['tool'], shas['data'], '0' * 40], 16)
+    assert heads == {shas['tool']: b'#!/usr/bin/env p', shas['data']: b'\0\1\2' * 5 + b'\0'}
+    assert read_blobs(repo, [shas['data']])[shas['data']] == b'\0\1\2' * 1000
+
+    file_languages, _ = classify_tree(repo, entries)
+    assert file_languages == {'tool': 'Python'}
+    file_data = {'tool': {'lines': 100001}, 'data': {'lines': 0}}
+    languages, total_lines = detect_languages(file_data, file_languages, {'data': 'binary'})
+    assert dict(languages) == {'Python': 100001}
+    assert total_lines == 100001
@@ -0,0 +1,47 @@
+import subprocess
+import threading
+
+from mirror_cache import evict, list_mirrors, lock_mirror, thread_lock, update_mirror
+
+
+def make_repo(path):
+    path.mkdir()
+    subprocess.run(['git', 'init', '-q', str(path)], check=True)
+    subprocess.run(['git', '-C', str(path), '-c', 'user.name=A', '-c', 'user.email=a@example.com',
+                    'commit', '-q', '--allow-empty', '-m', 'first'], check=True)
+    return path.as_uri()
+
+
+def test_evict_skips_mirrors_in_use(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    used, idle = (make_repo(tmp_path / name) for name in ('used', 'idle'))
+    used_mirror, in_use = update_mirror(used, cache_dir, max_bytes=1 << 30)
+    idle_mirror, idle_lock = update_mirror(idle, cache_dir, max_bytes=1 << 30)
+    idle_lock.close()
+
+    # The lock is an flock, so another process holding it counts the same way.
+    try:
+        assert evict(cache_dir, 0) == [idle_mirror]
+        assert list_mirrors(cache_dir) == [used_mirror]
+    finally:
+        in_use.close()
+    assert evict(cache_dir, 0) == [used_mirror]
+
+
+def test_in_use_lock_blocks_exclusive_lock(tmp_path):
+    mirror = tmp_path / 'proj.git'
+    shared = lock_mirror(mirror)
+    assert lock_mirror(mirror, exclusive=True, blocking=False) is None
+    shared.close()
+    lock_mirror(mirror, exclusive=True, blocking=False).close()
+
+
+def test_threads_share_one_lock_per_mirror(tmp_path):
+    mirror = tmp_path / 'proj.git'
+    locks = []
+    threads = [threading.Thread(target=lambda: locks.append(thread_lock(mirror))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(lock is locks[0] for lock in locks)
@@ -0,0 +1,64 @@
+import gzip
+
+import pytest
+
+import web
+from report_cache import RenderedReportCache, is_safe_url, render_markdown
+
+
+@pytest.mark.parametrize('text', [
+    "[x](javascript:alert(1))",
+    "[x](java\tscript:alert(1))",
+    "[x](JaVaScRiPt&#58;alert(1))",
+    "[x](data:text/html;base64,PHNjcmlwdD4=)",
+])
+def test_unsafe_link_targets_are_dropped(text):
+    assert render_markdown(text) == '<p><a>x</a></p>'
+
+
+def test_unsafe_image_sources_are_dropped():
+    assert render_markdown("![i](data:image/svg+xml;base64,PHN2Zz4=)") == '<p><img alt="i" /></p>'
+
+
+def test_safe_links_are_kept():
+    assert all(is_safe_url(url) for url in ('https://example.com', 'http://a.b/c', 'mailto:a@b.c', 'timeline.md', '#top'))
+    html = render_markdown("[a](https://example.com) [b](timeline.md)")
+    assert '<a href="https://example.com">a</a>' in html and '<a href="timeline.md">b</a>' in html
+
+
+def test_raw_html_is_shown_as_text():
+    html = render_markdown("<script>alert(1)</script>\n\nFix <b onclick=\"x()\">bold</b> commit")
+    assert '<script' not in html and '<b' not in html
+    assert '&lt;script&gt;alert(1)&lt;/script&gt;' in html
+
+
+def test_cache_renders_again_after_the_report_changes(tmp_path):
+    path = tmp_path / 'report.md'
+    path.write_text("# One\n")
+    cache = RenderedReportCache()
+    first = cache.get(path, lambda html: html)
+    assert cache.get(path, lambda html: 'not rendered again') is first
+    assert gzip.decompress(first.gzipped) == first.body == b'<h1>One</h1>'
+
+    path.write_text("# Two, longer\n")
+    second = cache.get(path, lambda html: html)
+    assert second.body == b'<h1>Two, longer</h1>' and second.etag != first.etag
+
+
+def test_report_view_answers_not_modified(sample_report, monkeypatch):
+    monkeypatch.setattr(web, 'reports_dir', sample_report.parent)
+    client = web.app.test_client()
+    url = '/report/sample/repo_info.md'
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip'
+    etag = response.headers['ETag']
+    assert etag.endswith('-gzip"')
+    assert b'sample' in gzip.decompress(response.data)
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304 and not response.data
+
+    # The plain body has its own tag.
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200 and 'Content-Encoding' not in response.headers
@@ -0,0 +1,50 @@
+import shutil
+
+from report_index import read_page
+
+
+def rows(page):
+    """Returns the (date, author or message) cells of the table rows of a page."""
+    return [tuple(cell.strip() for cell in line.split('|')[1:3])
+            for line in page['text'].splitlines() if line.startswith('| 2024-')]
+
+
+def test_timeline_pages(sample_report):
+    first = read_page(sample_report, 'timeline.md', 1, per_page=3)
+    last = read_page(sample_report, 'timeline.md', 3, per_page=3)
+    assert (first['page'], first['pages'], first['total']) == (1, 3, 7)
+    assert first['text'].startswith('# Development Timeline\n')
+    assert rows(first) == [('2024-01-01 10:00:00', 'Alice'), ('2024-01-02 10:00:00', 'Bob'), ('2024-01-03 10:00:00', 'Alice')]
+    assert rows(last) == [('2024-01-07 10:00:00', 'Alice')]
+    # Pages past the end show the last one.
+    assert read_page(sample_report, 'timeline.md', 9, per_page=3)['page'] == 3
+
+
+def test_timeline_filters(sample_report):
+    page = read_page(sample_report, 'timeline.md', author='Bob', since='2024-01-03', until='2024-01-06')
+    assert page['total'] == 2
+    assert rows(page) == [('2024-01-04 10:00:00', 'Bob'), ('2024-01-06 10:00:00', 'Bob')]
+    page = read_page(sample_report, 'timeline.md', author='Nobody')
+    assert (page['page'], page['pages'], page['total']) == (1, 1, 0)
+    assert page['text'].startswith('# Development Timeline\n') and rows(page) == []
+
+
+def test_contributor_pages_repeat_each_author_heading(sample_report):
+    page = read_page(sample_report, 'contributors.md', 2, per_page=3)
+    text = page['text']
+    assert page['total'] == 7
+    # Alice's last row, then Bob's first two, each under its author.
+    assert text.index('### Alice') < text.index('2024-01-07') < text.index('### Bob') < text.index('2024-01-02')
+    assert [date for date, _ in rows(page)] == ['2024-01-07 10:00:00', '2024-01-02 10:00:00', '2024-01-04 10:00:00']
+
+    page = read_page(sample_report, 'contributors.md', author='Bob')
+    assert '### Alice' not in page['text'] and page['total'] == 3
+
+
+def test_changed_report_is_not_read_through_a_stale_index(sample_report, tmp_path):
+    report_dir = tmp_path / 'sample'
+    shutil.copytree(sample_report, report_dir)
+    assert read_page(report_dir, 'timeline.md') is not None
+    with open(report_dir / 'timeline.md', 'a') as f:
+        f.write("\n")
+    assert read_page(report_dir, 'timeline.md') is None
@@ -0,0 +1,44 @@
+import hashlib
+
+import pytest
+
+from sketch import MAX_PRECISION, MIN_PRECISION, HyperLogLog, precision_for_error
+
+
+def shas(start, stop):
+    return [hashlib.sha1(str(number).encode()).hexdigest() for number in range(start, stop)]
+
+
+def sketch_of(items, precision=12):
+    sketch = HyperLogLog(precision)
+    for sha in items:
+        sketch.add(sha)
+    return sketch
+
+
+@pytest.mark.parametrize('count', [0, 1, 50, 1000, 20000])
+def test_estimate_is_within_the_error_bound(count):
+    sketch = sketch_of(shas(0, count))
+    # Four standard errors; small counts are exact up to a collision or two.
+    assert abs(sketch.estimate() - count) <= max(2, 4 * sketch.standard_error * count)
+
+
+def test_duplicates_are_counted_once():
+    items = shas(0, 500)
+    assert sketch_of(items * 3).estimate() == sketch_of(items).estimate()
+
+
+def test_merge_counts_the_union():
+    left, right = sketch_of(shas(0, 3000)), sketch_of(shas(2000, 5000))
+    left.merge(right)
+    assert left.registers == sketch_of(shas(0, 5000)).registers
+
+
+def test_precision_for_error():
+    assert precision_for_error(0.02) == 12
+    assert HyperLogLog(precision_for_error(0.02)).standard_error <= 0.02
+    assert precision_for_error(0.9) == MIN_PRECISION
+    assert precision_for_error(0.0001) == MAX_PRECISION
+    for error in (0, 1, -0.1, 2):
+        with pytest.raises(ValueError):
+            precision_for_error(error)
@@ -1,72 +1,31 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, Response, stream_with_context, jsonify
 import webbrowser
 import threading
 import os
-from main import analyze_repo, analyze_git_user, get_language_labels, safe_rmtree
+import json
+from main import analyze_repo, analyze_git_user, get_language_labels, REMOTE_URL_PREFIXES
+from file_utils import safe_rmtree
+from jobs import JobManager
+from catalog import ensure_catalog, list_reports, PAGE_SIZE
+from artifact import open_artifact, read_meta, has_tree_index, list_children
+from report_cache import RenderedReportCache, render_markdown
+from report_index import read_page
+from werkzeug.security import safe_join
 from pathlib import Path
-import sys
 import time
 
 app = Flask(__name__)
 app.secret_key = 'supersecretkey'  # Needed for flash messages
 
-# Global variables to track analysis progress
-progress = {'status': 'Idle', 'message': '', 'percentage': 0}
 reports_dir = Path('reports')
+# Set up by init_app() in the serving process only; job processes import this module too.
+jobs = None
+report_pages = RenderedReportCache()
 
 # Supported languages from main.py
 SUPPORTED_LANGS = ["EN", "TR", "IT", "FR", "ES", "DE"]
-
-
-def run_analysis_in_thread(func, *args):
-    """Runs the analysis function in a separate thread and updates progress."""
-
-    def wrapper():
-        global progress
-        try:
-            progress['status'] = 'Running'
-            func(*args)
-            progress['status'] = 'Complete'
-            progress['message'] = f"Analysis complete! Reports saved in: {reports_dir}"
-            progress['percentage'] = 100
-        except Exception as e:
-            progress['status'] = 'Error'
-            progress['message'] = f"Error: {str(e)}"
-            progress['percentage'] = 0
-            flash(f"Error during analysis: {str(e)}", "error")
-        finally:
-            if progress['status'] != 'Error':
-                flash("Analysis completed successfully!", "success")
-
-    # Redirect stdout/stderr to capture progress updates
-    sys.stdout = ProgressWriter()
-    sys.stderr = sys.stdout
-    thread = threading.Thread(target=wrapper)
-    thread.start()
-
-
-class ProgressWriter:
-    """Custom writer to capture progress updates from main.py."""
-
-    def write(self, text):
-        global progress
-        if "❌ Error" in text:
-            progress['status'] = 'Error'
-            progress['message'] = text.strip()
-        elif text.strip() and "✅" in text or "🧹" in text:
-            progress['message'] = text.strip()
-            progress['percentage'] = 100
-        elif text.strip():
-            # Extract percentage from progress bar output
-            try:
-                percentage = float(text.split()[-1].replace('%', ''))
-                progress['percentage'] = percentage
-                progress['message'] = text.split(']')[0].strip()
-            except (ValueError, IndexError):
-                progress['message'] = text.strip()
-
-    def flush(self):
-        pass
+# Reports shown page by page from their offset index
+PAGED_REPORTS = ('timeline.md', 'contributors.md')
 
 
 @app.route('/')
@@ -81,61 +40,169 @@ def analyze():
     if lang not in SUPPORTED_LANGS:
         lang = 'EN'
 
-    global progress
-    progress = {'status': 'Running', 'message': 'Starting analysis...', 'percentage': 0}
-
     if analysis_type == 'repo':
         repo_url = request.form.get('repo_url', '').strip()
         if not repo_url:
             flash("Repository URL cannot be empty.", "error")
             return redirect(url_for('index'))
-        run_analysis_in_thread(analyze_repo, repo_url, lang)
+        # Local paths would let anyone who can reach the page read and publish directories of this server.
+        if not repo_url.startswith(REMOTE_URL_PREFIXES):
+            flash("Only GitHub repository URLs (https://github.com/... or git@github.com:...) can be analyzed here.", "error")
+            return redirect(url_for('index'))
+        job = jobs.submit('repo', repo_url, lang, analyze_repo, repo_url, lang)
 
     elif analysis_type == 'user':
         username = request.form.get('username', '').strip()
         if not username:
             flash("GitHub username cannot be empty.", "error")
             return redirect(url_for('index'))
-        run_analysis_in_thread(analyze_git_user, username, lang)
+        job = jobs.submit('user', username, lang, analyze_git_user, username, lang)
 
     else:
         flash("Invalid analysis type.", "error")
         return redirect(url_for('index'))
 
-    return redirect(url_for('progress_page'))
+    return redirect(url_for('progress_page', job_id=job.id))
 
 
 @app.route('/progress')
-def progress_page():
-    return render_template('progress.html', progress=progress)
+def jobs_page():
+    return render_template('jobs.html', jobs=jobs.list())
+
+
+@app.route('/progress/<job_id>')
+def progress_page(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        flash("Analysis job not found.", "error")
+        return redirect(url_for('jobs_page'))
+    return render_template('progress.html', progress=job)
+
+
+@app.route('/progress/<job_id>/events')
+def progress_events(job_id):
+    """Streams the job's progress as Server-Sent Events until it finishes."""
+    job = jobs.get(job_id)
+    if job is None:
+        return Response("Analysis job not found.", status=404)
+
+    def stream():
+        for update in job.iter_updates():
+            if update is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"data: {json.dumps(update)}\n\n"
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/progress/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if not jobs.cancel(job_id):
+        flash("This analysis is no longer running.", "info")
+    return redirect(url_for('progress_page', job_id=job_id))
 
 
 @app.route('/reports')
 def reports():
-    if progress['status'] != 'Complete':
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind') if request.args.get('kind') in ('repo', 'user') else None
+    sort = 'name' if request.args.get('sort') == 'name' else 'recent'
+    page = max(request.args.get('page', 1, type=int), 1)
+    reports_list, total = list_reports(reports_dir, query, kind, page, PAGE_SIZE, sort)
+    if not total and not query and not kind:
         flash("No reports available yet. Please complete an analysis first.", "info")
         return redirect(url_for('index'))
 
-    repo_dirs = [d for d in reports_dir.iterdir() if d.is_dir()]
-    reports_list = []
-    for repo_dir in repo_dirs:
-        reports = [f.name for f in repo_dir.glob('*.md')]
-        reports_list.append({'name': repo_dir.name, 'files': reports})
-
-    return render_template('reports.html', reports=reports_list)
+    pages = max(1, -(-total // PAGE_SIZE))
+    return render_template('reports.html', reports=reports_list, total=total, page=page, pages=pages,
+                           query=query, kind=kind or '', sort=sort)
+
+
+def open_report_artifact(repo_name):
+    """Opens the analysis artifact of a report, or returns None if there is none."""
+    report_dir = safe_join(str(reports_dir), repo_name)
+    if report_dir is None:
+        return None
+    try:
+        return open_artifact(Path(report_dir))
+    except FileNotFoundError:
+        return None
+
+
+@app.route('/api/reports/<repo_name>/tree')
+def report_tree(repo_name):
+    """Returns one page of a folder's children (?path=dir&offset=N) with their lines and commit counts, as JSON."""
+    conn = open_report_artifact(repo_name)
+    if conn is None:
+        return jsonify(error="Report not found."), 404
+    try:
+        if not has_tree_index(read_meta(conn)):
+            return jsonify(error="This report was made by an older version; analyze the repository again."), 404
+        path = request.args.get('path', '').strip('/')
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        children, total = list_children(conn, path, offset)
+    finally:
+        conn.close()
+    return jsonify(path=path, offset=offset, total=total, children=children)
 
 
 @app.route('/report/<repo_name>/<filename>')
 def view_report(repo_name, filename):
-    report_path = reports_dir / repo_name / filename
-    if not report_path.exists():
+    """Serves a report rendered to HTML, from the cache after the first view, with ETag and gzip.
+
+    The folder structure is shown as a tree that loads each folder when it
+    is opened, so huge repositories do not send the whole listing. The
+    timeline and contributors are shown page by page (?page=N), optionally
+    for one author and a date range (?author=&since=&until=), reading only
+    the rows shown through the report's offset index.
+    """
+    report_path = safe_join(str(reports_dir), repo_name, filename)
+    if report_path is None or not filename.endswith('.md') or not os.path.isfile(report_path):
         flash("Report not found.", "error")
         return redirect(url_for('reports'))
 
-    with open(report_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    return render_template('report_view.html', content=content, repo_name=repo_name, filename=filename)
+    if filename == 'folder_structure.md':
+        conn = open_report_artifact(repo_name)
+        if conn is not None:
+            try:
+                meta = read_meta(conn)
+            finally:
+                conn.close()
+            if has_tree_index(meta):
+                approximate = float(meta['approximate_error']) if meta.get('approximate_error') else None
+                return render_template('tree_view.html', repo_name=repo_name, filename=filename, approximate=approximate)
+
+    if filename in PAGED_REPORTS:
+        filters = {key: request.args[key].strip() for key in ('author', 'since', 'until') if request.args.get(key, '').strip()}
+        page = read_page(Path(report_path).parent, filename, request.args.get('page', 1, type=int), **filters)
+        if page is not None:
+            return render_template('report_page.html', html=render_markdown(page['text']), repo_name=repo_name,
+                                   filename=filename, page=page['page'], pages=page['pages'], total=page['total'],
+                                   filters=filters)
+
+    rendered = report_pages.get(report_path, lambda html: render_template(
+        'report_view.html', html=html, repo_name=repo_name, filename=filename))
+    use_gzip = 'gzip' in request.accept_encodings
+    response = Response(rendered.gzipped if use_gzip else rendered.body, mimetype='text/html')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.set_etag(f"{rendered.etag}-gzip" if use_gzip else rendered.etag)
+    response.last_modified = rendered.last_modified
+    # Browsers keep the page but ask again each time; an unchanged report answers 304 Not Modified.
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def init_app():
+    """Prepares the reports directory, the catalog and the job manager of the web server."""
+    global jobs
+    reports_dir.mkdir(exist_ok=True)
+    # Analyses record their reports in the catalog; index reports made before it existed once.
+    ensure_catalog(reports_dir)
+    jobs = JobManager()
 
 
 def open_browser():
@@ -145,8 +212,7 @@ def open_browser():
 
 
 if __name__ == "__main__":
-    # Ensure reports directory exists
-    reports_dir.mkdir(exist_ok=True)
+    init_app()
 
     # Start Flask app in a thread and open browser
     threading.Thread(target=open_browser).start()